@@ -1,5 +1,5 @@
 import numpy as np
-from cuqi.geometry import _DefaultGeometry1D
+from cuqi.geometry import _DefaultGeometry1D, _is_identity_vector_geometry
 
 
 class CUQIarray(np.ndarray):
@@ -51,6 +51,7 @@ class CUQIarray(np.ndarray):
         if geometry is None:
             geometry = _DefaultGeometry1D(grid=obj.__len__())
         obj.geometry = geometry
+        obj._transform_cache = None
         # Finally, we must return the newly created object:
         return obj
 
@@ -59,11 +60,59 @@ class CUQIarray(np.ndarray):
         if obj is None: return
         self.is_par = getattr(obj, 'is_par', True)
         self.geometry = getattr(obj, 'geometry', None)
+        # Views and copies do not share the cached geometry transforms
+        self._transform_cache = None
+
+    def _cached_transform(self, name, transform):
+        """Return the result of `transform()` for the current data and
+        geometry. If the geometry opts in with `cache_transforms`, the result
+        is cached such that the expensive geometry mapping is only recomputed
+        if the geometry or the data changes. A copy of the cached result is
+        returned to avoid the cache being modified through the returned
+        array. Other geometries apply `transform()` directly, since comparing
+        and copying the data would cost more than the mapping itself."""
+        if not getattr(self.geometry, 'cache_transforms', False):
+            return transform()
+
+        cache = getattr(self, '_transform_cache', None)
+        if cache is None:
+            cache = self._transform_cache = {}
+
+        entry = cache.get(name)
+        if entry is not None:
+            geometry, data, vals = entry
+            if geometry is self.geometry and np.array_equal(data, self.to_numpy()):
+                return vals.copy()
+
+        vals = transform()
+        if isinstance(vals, np.ndarray) and vals.dtype != np.dtype('O') \
+                and self.dtype != np.dtype('O'):
+            vals = np.array(vals)
+            cache[name] = (self.geometry, self.to_numpy().copy(), vals)
+            return vals.copy()
+        return vals
 
     @property
     def funvals(self):
+        vals = self._funvals_raw
+        if isinstance(vals, np.ndarray):
+            # cast the np.ndarray to a CUQIarray
+            return type(self)(vals,is_par=False,geometry=self.geometry)
+        else:
+            return vals
+
+    @property
+    def _funvals_raw(self):
+        """Function values as returned by `funvals`, but without wrapping
+        numpy arrays as CUQIarray. Used internally when a plain numpy array
+        is sufficient, e.g. for plotting."""
+        # Parameters are function values for identity geometries
+        if _is_identity_vector_geometry(self.geometry):
+            return self.view(np.ndarray)
+
         if self.is_par is True:
-            vals = self.geometry.par2fun(self)
+            vals = self._cached_transform(
+                'funvals', lambda: self.geometry.par2fun(self))
         else:
             vals = self
 
@@ -75,13 +124,22 @@ class CUQIarray(np.ndarray):
                 # () to (1,).
                 return self.reshape(1)[0]
             else:
-                # else, cast the np.ndarray to a CUQIarray
-                return type(self)(vals,is_par=False,geometry=self.geometry) #vals.view(np.ndarray)
+                return vals.view(np.ndarray)
         else:
             return vals 
 
     @property
     def parameters(self):
+        return type(self)(self._parameters_raw,is_par=True,geometry=self.geometry)
+
+    @property
+    def _parameters_raw(self):
+        """Parameters as returned by `parameters`, but as a numpy array
+        instead of a CUQIarray."""
+        # Function values are parameters for identity geometries
+        if _is_identity_vector_geometry(self.geometry):
+            return self.view(np.ndarray)
+
         if self.is_par is False:
             if self.dtype == np.dtype('O'):
                 # If the current state if the CUQIarray is function values, and
@@ -91,11 +149,12 @@ class CUQIarray(np.ndarray):
                 funvals = self.reshape(1)[0]
             else:
                 funvals = self
-            vals = self.geometry.fun2par(funvals)
+            vals = self._cached_transform(
+                'parameters', lambda: self.geometry.fun2par(funvals))
 
         else:
             vals = self
-        return type(self)(vals,is_par=True,geometry=self.geometry)
+        return np.asarray(vals).view(np.ndarray)
 
     def to_numpy(self):
         """Return a numpy array of the CUQIarray data. If is_par is True, then 
@@ -111,7 +170,7 @@ class CUQIarray(np.ndarray):
     def plot(self, plot_par=False, **kwargs):
         if plot_par:
             kwargs["is_par"]=True
-            return self.geometry.plot(self.parameters, plot_par=plot_par, **kwargs)
+            return self.geometry.plot(self._parameters_raw, plot_par=plot_par, **kwargs)
         else:
             kwargs["is_par"]=False
-            return self.geometry.plot(self.funvals, **kwargs)
+            return self.geometry.plot(self._funvals_raw, **kwargs)
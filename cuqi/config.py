@@ -12,3 +12,6 @@ MAX_STACK_SEARCH_DEPTH = 1000
 
 MIN_DIM_SPARSE = 75
 """ Minimum dimension to start storing Nd-arrays as sparse for N>2. The minimum dimension is defined as MIN_DIM_SPARSE^N. """
+
+SPARSE_NNZ_RATIO = 0.15
+""" Maximum fraction of nonzero entries for which a given sparse matrix is factorized with sparse methods. Sparse matrices with more nonzeros are converted to dense arrays, where dense factorizations are faster. """
@@ -48,14 +48,26 @@ def Geweke(X, A = 0.1, B = 0.5):
 def spectrum0(x):
     # Spectral density at frequency zero
     # Marko Laine <marko.laine@fmi.fi>
+    # Same estimate as spectrum(x[:, i], m)[0][0] for each column i. At
+    # frequency zero the FFT of a windowed segment is its sum, so the
+    # estimate is computed for all columns at once without any FFTs.
     m, n = x.shape
-    s = np.empty(n)
-    for i in range(n):
-        # check this later: sp.signal.welch(x[:, i])[0] to avoid 'spectrum' fun
-        spec, _ = spectrum(x[:, i], m) 
-        s[i] = spec[0]
+    nw = int(np.fix(m/4))
+    noverlap = int(np.fix(nw/2))
+
+    # Hanning window
+    idx = np.arange(1, nw+1, 1)
+    w = 0.5*(1 - np.cos(2*np.pi*idx/(nw+1)))
+
+    # estimate PSD at frequency zero
+    step = nw - noverlap
+    k = int(np.fix((m-noverlap)/step))             # number of windows
+    kmu = k*np.linalg.norm(w)**2                   # normalizing scale factor
+    s = np.zeros(n)
+    for start in range(0, k*step, step):
+        s += (w @ x[start:start+nw, :])**2
 
-    return s
+    return s/kmu
 
 # ===================================================================
 def spectrum(x, nfft):
@@ -94,6 +94,13 @@ class Gaussian(Distribution):
     def __init__(self, mean=None, cov=None, prec=None, sqrtcov=None, sqrtprec=None, is_symmetric=True, **kwargs):
         super().__init__(is_symmetric=is_symmetric, **kwargs)
 
+        self._sqrtprec_kind = None # Structure of sqrtprec ('scalar', 'diag', 'upper', 'lower', 'dense', 'sparse' or 'cholmod'). Set by the matrix setters.
+        self._prec_needs_compute = False # If the precision is to be computed from sqrtprec when accessed
+        self._sqrtprec_diag = None # Diagonal of sqrtprec as a vector when kind is 'scalar' or 'diag'
+        self._sqrtprec_factor = None # LU factorization of sqrtprec computed on first use in _sample when sqrtprec is not diagonal or triangular. For kind 'cholmod' the cholmod factor of cov
+        self._e_buf = None # Buffer for standard normal draws when sampling with a numpy Generator
+        self._cholmod_cache = {} # Symbolic sparse Cholesky analysis reused when a matrix is set again with the same sparsity pattern
+
         self.mean = mean
 
         # If everything is None we default to covariance as the mutable variables
@@ -128,6 +135,7 @@ class Gaussian(Distribution):
     @mean.setter
     def mean(self, value):
         self._mean = force_ndarray(value, flatten=True)
+        self._sqrtprecTimesMean = None
 
     @property
     def cov(self):
@@ -147,9 +155,10 @@ class Gaussian(Distribution):
                 sparse_flag = True # do sparse computations
             else:
                 sparse_flag = False  # use numpy
-            prec, sqrtprec, logdet, rank = get_sqrtprec_from_cov(self.dim, value, sparse_flag)
+            prec, sqrtprec, logdet, rank, kind = get_sqrtprec_from_cov(self.dim, _densify_if_filled(value), sparse_flag, self._cholmod_cache)
             self._prec = prec
-            self._sqrtprec = sqrtprec
+            self._prec_needs_compute = prec is None
+            self._set_sqrtprec_structure(sqrtprec, kind)
             self._logdet = logdet
             self._rank = rank
 
@@ -158,6 +167,9 @@ class Gaussian(Distribution):
         """ Precision of the distribution """
         if not hasattr(self, '_prec'):
             raise NotImplementedError(f"Precision is not computed by default for a Gaussian initialized with {self.get_mutable_variables()} and dim {self.dim}")
+        if self._prec is None and self._prec_needs_compute:
+            self._prec = self.sqrtprec.T @ self.sqrtprec
+            self._prec_needs_compute = False
         return self._prec
 
     @prec.setter
@@ -172,8 +184,8 @@ class Gaussian(Distribution):
                 sparse_flag = True # do sparse computations
             else:
                 sparse_flag = False  # use numpy
-            sqrtprec, logdet, rank = get_sqrtprec_from_prec(self.dim, value, sparse_flag)
-            self._sqrtprec = sqrtprec
+            sqrtprec, logdet, rank, kind = get_sqrtprec_from_prec(self.dim, _densify_if_filled(value), sparse_flag, self._cholmod_cache)
+            self._set_sqrtprec_structure(sqrtprec, kind)
             self._logdet = logdet
             self._rank = rank
 
@@ -196,15 +208,18 @@ class Gaussian(Distribution):
                 sparse_flag = True # do sparse computations
             else:
                 sparse_flag = False  # use numpy
-            prec, sqrtprec, logdet, rank = get_sqrtprec_from_sqrtcov(self.dim, value, sparse_flag)
+            prec, sqrtprec, logdet, rank, kind = get_sqrtprec_from_sqrtcov(self.dim, _densify_if_filled(value), sparse_flag, self._cholmod_cache)
             self._prec = prec
-            self._sqrtprec = sqrtprec
+            self._prec_needs_compute = prec is None
+            self._set_sqrtprec_structure(sqrtprec, kind)
             self._logdet = logdet
             self._rank = rank
 
     @property
     def sqrtprec(self):
         """ Square root of the precision of the distribution. For 1D Gaussian this is the inverse standard deviation. """
+        if self._sqrtprec_kind == 'cholmod' and self._sqrtprec is None: # Formed from the cholmod factor of cov only when accessed
+            self._sqrtprec = self._apply_sqrtprec(spa.identity(self.dim, format="csc"))
         return self._sqrtprec
 
     @sqrtprec.setter
@@ -219,11 +234,30 @@ class Gaussian(Distribution):
                 sparse_flag = True # do sparse computations
             else:
                 sparse_flag = False  # use numpy
-            sqrtprec, logdet, rank = get_sqrtprec_from_sqrtprec(self.dim, value, sparse_flag)
-            self._sqrtprec = sqrtprec 
+            sqrtprec, logdet, rank, kind = get_sqrtprec_from_sqrtprec(self.dim, _densify_if_filled(value), sparse_flag, self._cholmod_cache)
+            self._set_sqrtprec_structure(sqrtprec, kind)
             self._logdet = logdet
             self._rank = rank
 
+    def _set_sqrtprec_structure(self, sqrtprec, kind):
+        """ Store sqrtprec computed by the helper functions along with its structure kind and reset quantities derived from it.
+
+        For kind 'cholmod' the helper functions return the cholmod factor of cov in place of sqrtprec. It is kept as the factor of sqrtprec, which is only formed if accessed.
+        """
+        if kind == 'cholmod':
+            self._sqrtprec, self._sqrtprec_factor = None, sqrtprec
+        else:
+            self._sqrtprec, self._sqrtprec_factor = sqrtprec, None
+        self._sqrtprec_kind = kind
+        self._sqrtprec_diag = sqrtprec.diagonal() if kind in ('scalar', 'diag') else None
+        self._sqrtprecTimesMean = None
+
+    def _apply_sqrtprec(self, x):
+        """ Compute sqrtprec@x. For kind 'cholmod' this solves with the lower Cholesky factor L of cov = P.T@L@L.T@P, since sqrtprec = inv(L)@P. """
+        if self._sqrtprec_kind == 'cholmod':
+            return self._sqrtprec_factor.solve_L(self._sqrtprec_factor.apply_P(x), use_LDLt_decomposition=False)
+        return self.sqrtprec@x
+
     @property
     def logdet(self):
         """ Logarithm of the determinant of the covariance of the distribution """
@@ -237,8 +271,11 @@ class Gaussian(Distribution):
 
     @property
     def sqrtprecTimesMean(self):
-        mean = np.repeat(self.mean, self.dim) if len(self.mean) == 1 else self.mean
-        return (self.sqrtprec@mean).flatten()
+        """ Square root of the precision times the mean. Cached until mean or the matrix defining the Gaussian is set again. """
+        if self._sqrtprecTimesMean is None:
+            mean = np.repeat(self.mean, self.dim) if len(self.mean) == 1 else self.mean
+            self._sqrtprecTimesMean = np.asarray(self._apply_sqrtprec(mean)).flatten()
+        return self._sqrtprecTimesMean
 
     def compute_cov(self):
         """ Computes the covariance matrix regardless of the mutable variables. 
@@ -283,7 +320,18 @@ class Gaussian(Distribution):
     def _logupdf(self, x):
         """ Un-normalized log density """
         dev = x - self.mean
-        mahadist = np.sum(np.square(self.sqrtprec @ dev.T), axis=0)
+        if self._sqrtprec_kind in ('scalar', 'diag'): # element-wise scaling, no matmul needed
+            y = self._sqrtprec_diag*dev
+            mahadist = np.einsum('...i,...i->...', y, y)
+        elif self._sqrtprec_kind == 'cholmod': # sparse triangular solve with the factor of cov
+            y = self._apply_sqrtprec(dev.T)
+            mahadist = np.einsum('i...,i...->...', y, y)
+        elif self._sqrtprec_kind in ('upper', 'lower') and not spa.issparse(self.sqrtprec): # triangular BLAS product, half the flops of a full matmul
+            y = splinalg.blas.dtrmm(1.0, self.sqrtprec, dev.T if dev.ndim == 2 else dev[:, None], lower=int(self._sqrtprec_kind == 'lower'))
+            mahadist = np.einsum('ij,ij->j', y, y)
+        else:
+            y = self.sqrtprec @ dev.T
+            mahadist = np.einsum('i...,i...->...', y, y) # column-wise squared norm without the np.square temporary
         return -0.5*mahadist.flatten()
 
     def logpdf(self, x):
@@ -304,45 +352,78 @@ class Gaussian(Distribution):
             raise NotImplementedError("Gradient not implemented for distribution {} with geometry {}".format(self,self.geometry))
 
         if not callable(self.mean): # for prior
-            return -( self.prec @ (val - self.mean).T )
+            return -self._apply_prec((val - self.mean).T)
         elif hasattr(self.mean, "gradient"): # for likelihood
             model = self.mean
             dev = val - model.forward(*args, **kwargs)
             if isinstance(dev, numbers.Number):
                 dev = np.array([dev])
-            return model.gradient(self.prec @ dev, *args, **kwargs)
+            return model.gradient(self._apply_prec(dev), *args, **kwargs)
         else:
             warnings.warn('Gradient not implemented for {}'.format(type(self.mean)))
 
+    def _apply_prec(self, x):
+        """ Compute prec@x as sqrtprec.T@(sqrtprec@x) without forming the precision matrix. """
+        if self._sqrtprec_kind in ('scalar', 'diag'):
+            prec_diag = self._sqrtprec_diag**2
+            return prec_diag*x if np.ndim(x) == 1 else prec_diag[:, None]*x
+        if self._sqrtprec_kind == 'cholmod': # prec@x = inv(cov)@x
+            return self._sqrtprec_factor.solve_A(x)
+        return self.sqrtprec.T @ (self.sqrtprec @ x)
+
     def _sample(self, N=1, rng=None):
         """ Generate samples of the Gaussian distribution using
         `s = mean + pseudoinverse(sqrtprec)*e`,
         where `e` is a standard Gaussian random vector and `s` is the desired sample 
         """
         # Sample N(0,I)
-        if rng is not None:
-            e = rng.randn(np.shape(self.sqrtprec)[0], N)
+        n = self.dim if self._sqrtprec_kind == 'cholmod' else np.shape(self.sqrtprec)[0] # sqrtprec is not formed for 'cholmod'
+        if isinstance(rng, np.random.Generator): # fill a reused buffer in-place
+            if self._e_buf is None or self._e_buf.shape != (n, N):
+                self._e_buf = np.empty((n, N))
+            e = rng.standard_normal(out=self._e_buf)
+        elif rng is not None:
+            e = rng.randn(n, N)
         else:
-            e = np.random.randn(np.shape(self.sqrtprec)[0], N)
-
-        # Compute perturbation
-        if spa.issparse(self.sqrtprec): # do sparse
-            if (N == 1):
-                perturbation = spa.linalg.spsolve(self.sqrtprec, e)[:, None]
-            else:
-                perturbation = spa.linalg.spsolve(self.sqrtprec, e)
+            e = np.random.randn(n, N)
+
+        # Compute perturbation (dispatch on the structure of sqrtprec determined by the setters)
+        if self._sqrtprec_kind in ('scalar', 'diag'):
+            perturbation = e/self._sqrtprec_diag[:, None]
+        elif self._sqrtprec_kind == 'cholmod': # inv(sqrtprec)@e = P.T@L@e with the sparse factor of cov
+            perturbation = self._sqrtprec_factor.apply_Pt(self._sqrtprec_factor.L()@e)
+        elif spa.issparse(self.sqrtprec): # do sparse, reusing the factorization between calls
+            if self._sqrtprec_factor is None and self._sqrtprec_kind in ('upper', 'lower'):
+                # Natural ordering without pivoting gives an LU of a triangular matrix with no fill-in,
+                # so the solve is a plain O(nnz) forward or backward substitution
+                self._sqrtprec_factor = spa.linalg.splu(spa.csc_matrix(self.sqrtprec), permc_spec='NATURAL', diag_pivot_thresh=0)
+            elif self._sqrtprec_factor is None:
+                self._sqrtprec_factor = spa.linalg.splu(spa.csc_matrix(self.sqrtprec))
+            perturbation = self._sqrtprec_factor.solve(e)
+        elif self._sqrtprec_kind in ('upper', 'lower'): # triangular, solved directly with LAPACK
+            perturbation, info = splinalg.lapack.dtrtrs(self.sqrtprec, np.asfortranarray(e), lower=int(self._sqrtprec_kind == 'lower'), overwrite_b=1)
+            if info > 0:
+                raise nplinalg.LinAlgError(f"Singular sqrtprec: zero on the diagonal at index {info-1}")
         else:
-            if np.allclose(self.sqrtprec, np.tril(self.sqrtprec)): # matrix is triangular
-                perturbation = splinalg.solve_triangular(self.sqrtprec, e)
-            else:
-                perturbation = splinalg.solve(self.sqrtprec, e)
+            if self._sqrtprec_factor is None:
+                with warnings.catch_warnings():
+                    # Singularity is checked from the pivots below
+                    warnings.simplefilter("ignore", splinalg.LinAlgWarning)
+                    lu, piv = splinalg.lu_factor(self.sqrtprec)
+                # A (numerically) zero pivot means sqrtprec is singular, e.g. from the
+                # pseudoinverse of a rank deficient covariance. Solving would give NaN samples.
+                pivots = np.abs(np.diag(lu))
+                if np.any(pivots <= pivots.max()*n*np.finfo(lu.dtype).eps):
+                    raise nplinalg.LinAlgError("Matrix is singular.")
+                self._sqrtprec_factor = (lu, piv)
+            perturbation = splinalg.lu_solve(self._sqrtprec_factor, e, check_finite=False)
 
         # Add mean
         s = self.mean[:, None] + perturbation
         return s
 
 # ======= Helper functions for Gaussian distribution =======
-def get_sqrtprec_from_cov(dim, cov, sparse_flag):
+def get_sqrtprec_from_cov(dim, cov, sparse_flag, cholmod_cache=None):
     """ Compute square root of precision matrix from covariance matrix.
     
     Also computes log determinant and rank of covariance matrix.
@@ -357,6 +438,15 @@ def get_sqrtprec_from_cov(dim, cov, sparse_flag):
 
     sparse_flag: bool
         Whether to store matrices as Dense or Sparse
+
+    cholmod_cache: dict, optional
+        Cache for reusing the symbolic cholmod analysis between calls, see _cholmod_cholesky.
+
+    Returns
+    -------
+    prec, sqrtprec, logdet, rank and kind, where kind is one of 'scalar', 'diag', 'upper', 'lower', 'dense', 'sparse' or 'cholmod' and describes the structure of sqrtprec.
+    For kind 'cholmod' the cholmod factor of cov is returned in place of sqrtprec.
+    prec is None when it equals sqrtprec.T@sqrtprec and is left to be computed on demand.
     
     """
     # cov is scalar
@@ -364,6 +454,7 @@ def get_sqrtprec_from_cov(dim, cov, sparse_flag):
         var = cov.ravel()[0]
         logdet = dim*np.log(var)
         rank = dim
+        kind = 'scalar'
         if sparse_flag:
             prec = (1/var)*spa.identity(dim, format="csr")
             sqrtprec = np.sqrt(1/var)*spa.identity(dim, format="csr")
@@ -375,6 +466,7 @@ def get_sqrtprec_from_cov(dim, cov, sparse_flag):
     elif not spa.issparse(cov) and cov.shape[0] == np.size(cov): 
         logdet = np.sum(np.log(cov))
         rank = dim
+        kind = 'diag'
         if sparse_flag:
             prec = spa.diags(1/cov, format="csr")
             sqrtprec = spa.diags(np.sqrt(1/cov), format="csr")
@@ -383,10 +475,11 @@ def get_sqrtprec_from_cov(dim, cov, sparse_flag):
             sqrtprec = np.diag(np.sqrt(1/cov))
 
     # cov diagonal
-    elif hasattr(cov, 'diagonal') and np.count_nonzero(cov-np.diag(cov.diagonal())) == 0:
+    elif hasattr(cov, 'diagonal') and _is_diagonal(cov):
         var = cov.diagonal()
         logdet = np.sum(np.log(var))
         rank = dim
+        kind = 'diag'
         if sparse_flag:
             prec = spa.diags(1/var, format="csr")
             sqrtprec = spa.diags(np.sqrt(1/var), format="csr")
@@ -398,44 +491,53 @@ def get_sqrtprec_from_cov(dim, cov, sparse_flag):
     else:
         if spa.issparse(cov):
             if has_cholmod:
-                L_cholmod = skchol.cholesky(cov, ordering_method='natural')
-                prec = L_cholmod.inv()
-                sqrtprec = sparse_cholesky(prec)
+                kind = 'cholmod'
+                L_cholmod = _cholmod_cholesky(cov, cholmod_cache)
+                # cov = L@L.T (natural ordering) so sqrtprec = inv(L) satisfies sqrtprec.T@sqrtprec = prec.
+                # inv(L) is generally dense even for sparse L, so the factor is returned in its place and applied with solves.
+                sqrtprec = L_cholmod
+                prec = None # computed from sqrtprec on first access
                 logdet = L_cholmod.logdet()
                 rank = spa.csgraph.structural_rank(cov) # or nplinalg.matrix_rank(cov.todense())
                 # sqrtcov = L_cholmod.L()
             else:
+                kind = 'upper'
                 prec = spa.linalg.inv(cov)
                 sqrtprec = sparse_cholesky(prec)
                 logdet = None # np.log(nplinalg.det(cov.todense()))
                 rank = spa.csgraph.structural_rank(cov)                        
         else:
-            if not np.allclose(cov, cov.T):
+            if not _is_symmetric(cov):
                 raise ValueError("Covariance matrix has to be symmetric.") 
-            if sparse_flag:
+            if sparse_flag: # Cholesky is much cheaper than eigh. Semidefinite cov falls back to the pseudoinverse below
+                sqrtprec = _cholesky_or_none(_upper_sqrtprec_from_cov, cov)
+            else:
+                sqrtprec = _upper_sqrtprec_from_cov(cov)
+            if sqrtprec is None:
                 # this comes from scipy implementation
-                s, u = splinalg.eigh(cov, check_finite=True)
+                s, u = splinalg.eigh(cov, check_finite=False, driver='evr')
                 eps = eigvalsh_to_eps(s)
                 if np.min(s) < -eps:
                     raise ValueError("The input matrix must be symmetric positive semidefinite.")                    
-                d = s[s > eps]                    
-                s_pinv = np.array([0 if abs(x) <= eps else 1/x for x in s], dtype=float)
+                mask = np.abs(s) > eps # equals s > eps since s >= -eps
+                d = s[mask]
+                s_pinv = np.divide(1.0, s, where=mask, out=np.zeros_like(s, dtype=float))
                 
                 U = np.multiply(u, np.sqrt(s_pinv))
-                sqrtprec = U @ np.diag(np.sign(np.diag(U))) #ensure sign is deterministic (scipy gives non-deterministic result)
                 sqrtprec = U.T # We want to have the columns as the eigenvectors
                 
                 rank = len(d)
                 logdet = np.sum(np.log(d))
-                prec = sqrtprec.T @ sqrtprec
+                prec = None # computed from sqrtprec on first access
+                kind = 'dense'
             else:
-                rank = nplinalg.matrix_rank(cov)
-                logdet = np.log(nplinalg.det(cov))
-                prec = nplinalg.inv(cov)
-                sqrtprec = nplinalg.cholesky(prec).T
-    return prec, sqrtprec, logdet, rank
+                rank = dim
+                logdet = -2*np.sum(np.log(np.diag(sqrtprec))) # log det(cov) = -log det(prec) read off the triangular factor
+                prec = None # computed from sqrtprec on first access
+                kind = 'upper' # Cholesky factor
+    return prec, sqrtprec, logdet, rank, kind
 
-def get_sqrtprec_from_prec(dim, prec, sparse_flag):
+def get_sqrtprec_from_prec(dim, prec, sparse_flag, cholmod_cache=None):
     """ Compute square root of precision matrix from precision matrix.
     
     Also computes log determinant and rank of precision matrix.
@@ -450,6 +552,13 @@ def get_sqrtprec_from_prec(dim, prec, sparse_flag):
 
     sparse_flag: bool
         Whether to store matrices as Dense or Sparse
+
+    cholmod_cache: dict, optional
+        Cache for reusing the symbolic cholmod analysis between calls, see _cholmod_cholesky.
+
+    Returns
+    -------
+    sqrtprec, logdet, rank and kind, where kind is one of 'scalar', 'diag', 'upper', 'lower', 'dense' or 'sparse' and describes the structure of sqrtprec.
     
     """
     # prec is scalar
@@ -457,6 +566,7 @@ def get_sqrtprec_from_prec(dim, prec, sparse_flag):
         precision = prec.ravel()[0]
         logdet = -dim*np.log(precision)
         rank = dim
+        kind = 'scalar'
         if sparse_flag:
             # cov = (1/precision)*spa.identity(dim, format="csr") # For computational efficiency we do not compute cov. We leave code for reference.
             sqrtprec = np.sqrt(precision)*spa.identity(dim, format="csr")
@@ -468,6 +578,7 @@ def get_sqrtprec_from_prec(dim, prec, sparse_flag):
     elif not spa.issparse(prec) and prec.shape[0] == np.size(prec): 
         logdet = np.sum(-np.log(prec))
         rank = dim
+        kind = 'diag'
         if sparse_flag:
             # cov = spa.diags(1/prec, format="csr") # For computational efficiency we do not compute cov. We leave code for reference.
             sqrtprec = spa.diags(np.sqrt(prec), format="csr")
@@ -476,10 +587,11 @@ def get_sqrtprec_from_prec(dim, prec, sparse_flag):
             sqrtprec = np.diag(np.sqrt(prec))
 
     # prec diagonal
-    elif hasattr(prec, 'diagonal') and np.count_nonzero(prec-np.diag(prec.diagonal())) == 0:
+    elif hasattr(prec, 'diagonal') and _is_diagonal(prec):
         precision = prec.diagonal()
         logdet = np.sum(-np.log(precision))
         rank = dim
+        kind = 'diag'
         if sparse_flag:
             # cov = spa.diags(1/precision, format="csr") # For computational efficiency we do not compute cov. We leave code for reference.
             sqrtprec = spa.diags(np.sqrt(precision), format="csr")
@@ -490,8 +602,9 @@ def get_sqrtprec_from_prec(dim, prec, sparse_flag):
     # prec is full
     else:
         if spa.issparse(prec):
+            kind = 'upper' # Cholesky factor
             if has_cholmod:
-                L_cholmod = skchol.cholesky(prec, ordering_method='natural')
+                L_cholmod = _cholmod_cholesky(prec, cholmod_cache)
                 sqrtprec = L_cholmod.L().T
                 # cov = L_cholmod.inv() # For computational efficiency we do not compute cov. We leave code for reference.
                 logdet = -L_cholmod.logdet()
@@ -502,29 +615,33 @@ def get_sqrtprec_from_prec(dim, prec, sparse_flag):
                 logdet = None # np.log(nplinalg.det(cov.todense()))
                 rank = spa.csgraph.structural_rank(prec)                    
         else:
-            if not np.allclose(prec, prec.T):
+            if not _is_symmetric(prec):
                 raise ValueError("Precision matrix has to be symmetric.") 
-            if sparse_flag:
-                s, u = splinalg.eigh(prec, check_finite=True)
+            if sparse_flag: # Cholesky is much cheaper than eigh. Semidefinite prec falls back to the eigendecomposition below
+                sqrtprec = _cholesky_or_none(splinalg.cholesky, prec)
+            else:
+                sqrtprec = splinalg.cholesky(prec, lower=False)
+            if sqrtprec is None:
+                s, u = splinalg.eigh(prec, check_finite=False, driver='evr')
                 eps = eigvalsh_to_eps(s)
                 if np.min(s) < -eps:
                     raise ValueError("The input matrix must be symmetric positive semidefinite.")                    
                 d = s[s > eps]
                 
-                U = np.multiply(u, np.sqrt(s))
-                sqrtprec = U @ np.diag(np.sign(np.diag(U))) #ensure sign is deterministic (scipy gives non-deterministic result)
+                U = np.multiply(u, np.sqrt(np.maximum(s, 0))) # clip round-off negatives in [-eps, 0)
                 sqrtprec = U.T # We want to have the columns as the eigenvectors
                 
                 rank = len(d)
                 logdet = -np.sum(np.log(d))
+                kind = 'dense'
             else:
-                rank = nplinalg.matrix_rank(prec)
-                logdet = -np.log(nplinalg.det(prec))
+                rank = dim
                 # cov = nplinalg.inv(prec) # For computational efficiency we do not compute cov. We leave code for reference.
-                sqrtprec = nplinalg.cholesky(prec).T
-    return sqrtprec, logdet, rank
+                logdet = -2*np.sum(np.log(np.diag(sqrtprec)))
+                kind = 'upper' # Cholesky factor
+    return sqrtprec, logdet, rank, kind
 
-def get_sqrtprec_from_sqrtcov(dim, sqrtcov, sparse_flag):
+def get_sqrtprec_from_sqrtcov(dim, sqrtcov, sparse_flag, cholmod_cache=None):
     """ Compute square root of precision matrix from square root of covariance matrix.
     
     Also computes log determinant and rank of precision matrix.
@@ -539,6 +656,14 @@ def get_sqrtprec_from_sqrtcov(dim, sqrtcov, sparse_flag):
 
     sparse_flag: bool
         Whether to store matrices as Dense or Sparse
+
+    cholmod_cache: dict, optional
+        Cache for reusing the symbolic cholmod analysis between calls, see _cholmod_cholesky.
+
+    Returns
+    -------
+    prec, sqrtprec, logdet, rank and kind, where kind is one of 'scalar', 'diag', 'upper', 'lower', 'dense' or 'sparse' and describes the structure of sqrtprec.
+    prec is None when it equals sqrtprec.T@sqrtprec and is left to be computed on demand.
     
     """
     # sqrtcov is scalar
@@ -547,6 +672,7 @@ def get_sqrtprec_from_sqrtcov(dim, sqrtcov, sparse_flag):
         var = sqrtcov**2
         logdet = dim*np.log(var)
         rank = dim
+        kind = 'scalar'
         if sparse_flag:
             prec = (1/var)*spa.identity(dim, format="csr")
             sqrtprec = (1/sqrtcov)*spa.identity(dim, format="csr")
@@ -559,6 +685,7 @@ def get_sqrtprec_from_sqrtcov(dim, sqrtcov, sparse_flag):
         cov = sqrtcov**2
         logdet = np.sum(np.log(cov))
         rank = dim
+        kind = 'diag'
         if sparse_flag:
             prec = spa.diags(1/cov, format="csr")
             sqrtprec = spa.diags(1/sqrtcov, format="csr")
@@ -567,11 +694,12 @@ def get_sqrtprec_from_sqrtcov(dim, sqrtcov, sparse_flag):
             sqrtprec = np.diag(1/sqrtcov)
 
     # sqrtcov diagonal
-    elif hasattr(sqrtcov, 'diagonal') and np.count_nonzero(sqrtcov-np.diag(sqrtcov.diagonal())) == 0: 
+    elif hasattr(sqrtcov, 'diagonal') and _is_diagonal(sqrtcov): 
         std = sqrtcov.diagonal()
         var = std**2
         logdet = np.sum(np.log(var))
         rank = dim
+        kind = 'diag'
         if sparse_flag:
             prec = spa.diags(1/var, format="csr")
             sqrtprec = spa.diags(1/std, format="csr")
@@ -582,46 +710,51 @@ def get_sqrtprec_from_sqrtcov(dim, sqrtcov, sparse_flag):
     # sqrtcov is full
     else:
         if spa.issparse(sqrtcov):
+            kind = 'sparse'
             if has_cholmod:
                 cov = sqrtcov@sqrtcov.T
-                L_cholmod = skchol.cholesky(cov, ordering_method='natural')
-                prec = L_cholmod.inv()
+                L_cholmod = _cholmod_cholesky(cov, cholmod_cache)
                 sqrtprec = spa.linalg.inv(sqrtcov) # sparse_cholesky(prec)
+                prec = None # computed from sqrtprec on first access
                 logdet = L_cholmod.logdet()
                 rank = spa.csgraph.structural_rank(cov)# or nplinalg.matrix_rank(cov.todense())
                 # sqrtcov = L_cholmod.L() # For computational efficiency we do not compute sqrtcov. We leave code for reference.
             else:
                 sqrtprec = spa.linalg.inv(sqrtcov)
-                prec = sqrtprec.T@sqrtprec
+                prec = None # computed from sqrtprec on first access
                 logdet = None # np.log(nplinalg.det(cov.todense()))
-                rank = spa.csgraph.structural_rank(prec)                  
+                rank = spa.csgraph.structural_rank(sqrtcov) # same structural rank as its inverse
         else:
-            if sparse_flag:
+            cov = sqrtcov@sqrtcov.T
+            if sparse_flag: # Cholesky is much cheaper than eigh. Semidefinite cov falls back to the pseudoinverse below
+                sqrtprec = _cholesky_or_none(_upper_sqrtprec_from_cov, cov)
+            else:
+                sqrtprec = _upper_sqrtprec_from_cov(cov)
+            if sqrtprec is None:
                 # this comes from scipy implementation
-                cov = sqrtcov@sqrtcov.T
-                s, u = splinalg.eigh(cov, check_finite=True)
+                s, u = splinalg.eigh(cov, check_finite=False, driver='evr')
                 eps = eigvalsh_to_eps(s)
                 if np.min(s) < -eps:
                     raise ValueError("The input matrix must be symmetric positive semidefinite.")                    
-                d = s[s > eps]                    
-                s_pinv = np.array([0 if abs(x) <= eps else 1/x for x in s], dtype=float)
+                mask = np.abs(s) > eps # equals s > eps since s >= -eps
+                d = s[mask]
+                s_pinv = np.divide(1.0, s, where=mask, out=np.zeros_like(s, dtype=float))
                 
                 U = np.multiply(u, np.sqrt(s_pinv))
-                sqrtprec = U @ np.diag(np.sign(np.diag(U))) #ensure sign is deterministic (scipy gives non-deterministic result)
                 sqrtprec = U.T # We want to have the columns as the eigenvectors
                 
                 rank = len(d)
                 logdet = np.sum(np.log(d))
-                prec = sqrtprec.T @ sqrtprec
+                prec = None # computed from sqrtprec on first access
+                kind = 'dense'
             else:
-                cov = sqrtcov@sqrtcov.T
-                rank = nplinalg.matrix_rank(cov)
-                logdet = np.log(nplinalg.det(cov))
-                prec = nplinalg.inv(cov)
-                sqrtprec = nplinalg.cholesky(prec).T
-    return prec, sqrtprec, logdet, rank
+                rank = dim
+                logdet = -2*np.sum(np.log(np.diag(sqrtprec))) # log det(cov) = -log det(prec) read off the triangular factor
+                prec = None # computed from sqrtprec on first access
+                kind = 'upper' # Cholesky factor
+    return prec, sqrtprec, logdet, rank, kind
 
-def get_sqrtprec_from_sqrtprec(dim, sqrtprec, sparse_flag):
+def get_sqrtprec_from_sqrtprec(dim, sqrtprec, sparse_flag, cholmod_cache=None):
     """ This computes the log determinant and rank of the precision matrix from the square root of the precision matrix.
 
     Stores the square root of the precision as a matrix.
@@ -636,12 +769,20 @@ def get_sqrtprec_from_sqrtprec(dim, sqrtprec, sparse_flag):
 
     sparse_flag: bool
         Whether to store matrices as Dense or Sparse
+
+    cholmod_cache: dict, optional
+        Cache for reusing the symbolic cholmod analysis between calls, see _cholmod_cholesky.
+
+    Returns
+    -------
+    sqrtprec, logdet, rank and kind, where kind is one of 'scalar', 'diag', 'upper', 'lower', 'dense' or 'sparse' and describes the structure of sqrtprec.
     """    
 
     # sqrtprec is scalar
     if (sqrtprec.shape[0] == 1): 
         logdet = -dim*np.log(sqrtprec**2)
         rank = dim
+        kind = 'scalar'
         dia = np.ones(dim)*sqrtprec.flatten()
         if sparse_flag:
             sqrtprec = spa.diags(dia)
@@ -652,6 +793,7 @@ def get_sqrtprec_from_sqrtprec(dim, sqrtprec, sparse_flag):
     elif not spa.issparse(sqrtprec) and sqrtprec.shape[0] == np.size(sqrtprec): 
         logdet = np.sum(-np.log(sqrtprec**2))
         rank = dim
+        kind = 'diag'
         if sparse_flag:
             sqrtprec = spa.diags(sqrtprec)
         else:
@@ -665,20 +807,23 @@ def get_sqrtprec_from_sqrtprec(dim, sqrtprec, sparse_flag):
     elif spa.isspmatrix_dia(sqrtprec):
         logdet = np.sum(-np.log(sqrtprec.data**2))
         rank = dim
+        kind = _triangular_kind(sqrtprec, default='sparse') # may have off-diagonals
 
     # sqrtprec diagonal
-    elif np.count_nonzero(sqrtprec-np.diag(sqrtprec.diagonal())) == 0:
+    elif _is_diagonal(sqrtprec):
         stdinv = sqrtprec.diagonal()
         precision = stdinv**2
         logdet = np.sum(-np.log(precision))
         rank = dim
+        kind = 'diag'
 
     # sqrtprec is full
     else:
         if spa.issparse(sqrtprec):
+            kind = _triangular_kind(sqrtprec, default='sparse')
             if has_cholmod:
                 prec = sqrtprec@sqrtprec.T
-                L_cholmod = skchol.cholesky(prec, ordering_method='natural')
+                L_cholmod = _cholmod_cholesky(prec, cholmod_cache)
                 logdet = -L_cholmod.logdet()
                 rank = spa.csgraph.structural_rank(prec)# or nplinalg.matrix_rank(cov.todense())
             else:
@@ -686,20 +831,26 @@ def get_sqrtprec_from_sqrtprec(dim, sqrtprec, sparse_flag):
                 logdet = None # np.log(nplinalg.det(cov.todense()))
                 rank = spa.csgraph.structural_rank(prec)                 
         else:
+            kind = _triangular_kind(sqrtprec, default='dense')
             if sparse_flag:
                 prec = sqrtprec@sqrtprec.T
-                s, _ = splinalg.eigh(prec, check_finite=True)
-                eps = eigvalsh_to_eps(s)
-                if np.min(s) < -eps:
-                    raise ValueError("The input matrix must be symmetric positive semidefinite.")                    
-                d = s[s > eps]
-                rank = len(d)
-                logdet = -np.sum(np.log(d))
+                L_prec = _cholesky_or_none(splinalg.cholesky, prec) # Cholesky is much cheaper than eigh
+                if L_prec is not None:
+                    rank = dim
+                    logdet = -2*np.sum(np.log(np.diag(L_prec)))
+                else:
+                    s = splinalg.eigh(prec, eigvals_only=True, check_finite=False, driver='evr')
+                    eps = eigvalsh_to_eps(s)
+                    if np.min(s) < -eps:
+                        raise ValueError("The input matrix must be symmetric positive semidefinite.")                    
+                    d = s[s > eps]
+                    rank = len(d)
+                    logdet = -np.sum(np.log(d))
             else:
-                prec = sqrtprec@sqrtprec.T
-                rank = nplinalg.matrix_rank(prec)
-                logdet = -np.log(nplinalg.det(prec))
-    return sqrtprec, logdet, rank
+                rank = nplinalg.matrix_rank(sqrtprec) # same rank as prec
+                _, logabsdet = nplinalg.slogdet(sqrtprec)
+                logdet = -2*logabsdet # log det(cov) = -log det(prec) = -2 log|det(sqrtprec)|
+    return sqrtprec, logdet, rank, kind
 
 def eigvalsh_to_eps(spectrum, cond=None, rcond=None):
     #Determine which eigenvalues are "small" given the spectrum.
@@ -712,6 +863,87 @@ def eigvalsh_to_eps(spectrum, cond=None, rcond=None):
     eps = cond * np.max(abs(spectrum))
     return eps
 
+def _densify_if_filled(A):
+    """ Convert sparse A to a dense array if its fraction of nonzeros exceeds config.SPARSE_NNZ_RATIO.
+
+    For such matrices dense factorizations are faster than sparse ones. Other input is returned as is.
+    """
+    if spa.issparse(A) and A.nnz > config.SPARSE_NNZ_RATIO*A.shape[0]*A.shape[1]:
+        return A.toarray()
+    return A
+
+def _is_diagonal(A):
+    """ Check if the dense or sparse matrix A is diagonal by comparing its number of nonzeros to that of its diagonal.
+
+    Unlike A - diag(A.diagonal()) this allocates no n x n array and is O(nnz) for sparse matrices.
+    """
+    nnz = A.count_nonzero() if spa.issparse(A) else np.count_nonzero(A)
+    return nnz == np.count_nonzero(A.diagonal())
+
+def _is_symmetric(A, block_size=256):
+    """ Evaluate np.allclose(A, A.T) for a dense matrix over blocks of rows.
+
+    Stops at the first non-symmetric block and keeps temporaries at block_size rows instead of several n x n arrays.
+    """
+    for i in range(0, A.shape[0], block_size):
+        if not np.allclose(A[i:i+block_size], A[:, i:i+block_size].T):
+            return False
+    return True
+
+def _triangular_kind(A, default):
+    """ Return 'upper' or 'lower' if the dense or sparse matrix A is triangular, otherwise default. O(nnz) for sparse A. """
+    if spa.issparse(A):
+        if spa.tril(A, k=-1).count_nonzero() == 0:
+            return 'upper'
+        if spa.triu(A, k=1).count_nonzero() == 0:
+            return 'lower'
+    else:
+        if not np.any(np.tril(A, k=-1)):
+            return 'upper'
+        if not np.any(np.triu(A, k=1)):
+            return 'lower'
+    return default
+
+def _upper_sqrtprec_from_cov(cov):
+    """ Compute the upper triangular square root of the precision matrix from a dense SPD covariance matrix.
+
+    The result R satisfies R.T@R = inv(cov) and equals the transposed Cholesky factor of the precision matrix.
+    It is computed from a single Cholesky factorization of the covariance, avoiding the explicit inverse.
+    Reversing the row and column order of cov gives an upper triangular factor U with cov = U@U.T, so that R = inv(U).
+    """
+    U = splinalg.cholesky(cov[::-1, ::-1], lower=True)[::-1, ::-1]
+    return splinalg.solve_triangular(U, np.identity(cov.shape[0]), lower=False)
+
+def _cholmod_cholesky(A, cache=None):
+    """ Sparse Cholesky factorization of A using cholmod with natural ordering.
+
+    If a cache (dict) is given, the symbolic analysis of A is stored in it and only the numerical
+    factorization is redone on later calls where A has the same sparsity pattern.
+    Each call returns a new factor, so factors from earlier calls remain valid.
+    """
+    if cache is None:
+        return skchol.cholesky(A, ordering_method='natural')
+    A = spa.csc_matrix(A)
+    analysis = cache.get('analysis')
+    if analysis is None or not (np.array_equal(cache['indptr'], A.indptr) and np.array_equal(cache['indices'], A.indices)):
+        analysis = skchol.analyze(A, ordering_method='natural')
+        cache.update(analysis=analysis, indptr=A.indptr.copy(), indices=A.indices.copy())
+    return analysis.cholesky(A)
+
+def _cholesky_or_none(factorize, A):
+    """ Apply a Cholesky based factorize(A) returning an upper triangular matrix, or return None if A is not numerically positive definite.
+
+    The squared diagonal entries of the factor (the Cholesky pivots) are compared against the tolerance from eigvalsh_to_eps.
+    """
+    try:
+        factor = factorize(A)
+    except nplinalg.LinAlgError:
+        return None
+    pivots = np.diag(factor)**2
+    if np.min(pivots) <= eigvalsh_to_eps(pivots):
+        return None
+    return factor
+
 class JointGaussianSqrtPrec(Distribution):
     """
     Joint Gaussian probability distribution defined by means and sqrt of precision matricies of independent Gaussians.
@@ -763,6 +995,10 @@ class JointGaussianSqrtPrec(Distribution):
         self._sqrtprecs = sqrtprecs
         self._dim = max(dim1,dim2)
 
+        # Stacked quantities are computed on first access and cached since means and sqrtprecs are fixed
+        self._sqrtprec = None
+        self._sqrtprecTimesMean = None
+
     def _sample(self,N):
         raise NotImplementedError("Sampling not implemented")
 
@@ -775,14 +1011,15 @@ class JointGaussianSqrtPrec(Distribution):
 
     @property
     def sqrtprec(self):
-        if spa.issparse(self._sqrtprecs[0]):
-            return spa.vstack((self._sqrtprecs))
-        else:
-            return np.vstack((self._sqrtprecs))
+        if self._sqrtprec is None:
+            if spa.issparse(self._sqrtprecs[0]):
+                self._sqrtprec = spa.vstack((self._sqrtprecs))
+            else:
+                self._sqrtprec = np.vstack((self._sqrtprecs))
+        return self._sqrtprec
 
     @property
     def sqrtprecTimesMean(self):
-        result = []
-        for i in range(len(self._means)):
-            result.append((self._sqrtprecs[i]@self._means[i]).flatten())
-        return np.hstack(result)
+        if self._sqrtprecTimesMean is None:
+            self._sqrtprecTimesMean = np.concatenate([(sqrtprec@mean).ravel() for (sqrtprec, mean) in zip(self._sqrtprecs, self._means)])
+        return self._sqrtprecTimesMean
@@ -1,9 +1,7 @@
 import scipy as sp
-from scipy.linalg.interpolative import estimate_spectral_norm
-from scipy.sparse.linalg import LinearOperator as scipyLinearOperator
 import numpy as np
 import cuqi
-from cuqi.solver import CGLS, FISTA
+from cuqi.solver import CGLS, PCGLS, FISTA
 from cuqi.experimental.mcmc import SamplerNew
 from cuqi.array import CUQIarray
 
@@ -37,6 +35,21 @@ class LinearRTONew(SamplerNew):
     tol : float
         Tolerance of the inner CGLS solver. *Optional*.
 
+    inner_solver : string
+        Inner least squares solver. Either "CGLS" or "PCGLS". "PCGLS" uses a Jacobi (column scaling) preconditioner computed from the diagonal of M^T M,
+        which can reduce the number of inner iterations needed for ill-conditioned problems. "PCGLS" requires the forward models to be matrices
+        or LinearModels defined by a matrix. *Optional*.
+
+    dtype : numpy dtype
+        Floating point precision of the inner solver. The square roots of the precision matrices, the perturbed data and the solver iterates are stored in this precision.
+        Single precision (np.float32) halves the memory traffic of the inner solver, but reduces the accuracy of each sample. For the full benefit the
+        forward models should also compute in single precision. Samples are stored in double precision. *Optional*.
+
+    block_size : int
+        Number of samples drawn per inner solve. If larger than 1, the perturbed least squares problems of block_size samples are solved together
+        by CGLS run on all right-hand sides at once, so products with the square roots of the precision matrices (and with M if it is explicit) act on
+        matrices instead of vectors. All problems in a block start from the current point. The "PCGLS" inner solver is not used in this case. *Optional*.
+
     callback : callable, *Optional*
         If set this function will be called after every sample.
         The signature of the callback function is `callback(sample, sample_index)`,
@@ -44,7 +57,9 @@ class LinearRTONew(SamplerNew):
         An example is shown in demos/demo31_callback.py.
         
     """
-    def __init__(self, target, initial_point=None, maxit=10, tol=1e-6, **kwargs):
+    def __init__(self, target, initial_point=None, maxit=10, tol=1e-6, inner_solver="CGLS", dtype=np.float64, block_size=1, **kwargs):
+
+        self._dtype = np.dtype(dtype) # Set before the target, since the precomputations depend on it
 
         super().__init__(target=target, initial_point=initial_point, **kwargs)
 
@@ -58,6 +73,38 @@ class LinearRTONew(SamplerNew):
         # Other parameters
         self.maxit = maxit
         self.tol = tol
+        self.inner_solver = inner_solver
+        self.block_size = block_size
+
+    @property
+    def dtype(self):
+        """ Floating point precision of the inner solver. """
+        return self._dtype
+
+    @property
+    def inner_solver(self):
+        """ Inner least squares solver used in each step. Either "CGLS" or "PCGLS". """
+        return self._inner_solver
+
+    @inner_solver.setter
+    def inner_solver(self, value):
+        if value not in ["CGLS", "PCGLS"]:
+            raise ValueError(f"Inner solver {value} not supported. Use 'CGLS' or 'PCGLS'.")
+        if value == "PCGLS":
+            self._check_explicit_operator()
+        self._inner_solver = value
+
+    @property
+    def block_size(self):
+        """ Number of samples drawn per inner solve. """
+        return self._block_size
+
+    @block_size.setter
+    def block_size(self, value):
+        if int(value) != value or value < 1:
+            raise ValueError("Block size must be a positive integer.")
+        self._block_size = int(value)
+        self._block_samples = None # Samples of the current block not yet returned by step
 
     @property
     def prior(self):
@@ -117,44 +164,139 @@ class LinearRTONew(SamplerNew):
         self._precompute()
 
     def _precompute(self):
-        L1 = [likelihood.distribution.sqrtprec for likelihood in self.likelihoods]
-        L2 = self.prior.sqrtprec
+        dtype = self.dtype
+        L1 = [_as_csr_if_sparse(likelihood.distribution.sqrtprec.astype(dtype, copy=False)) for likelihood in self.likelihoods]
+        L2 = _as_csr_if_sparse(self.prior.sqrtprec.astype(dtype, copy=False))
         L2mu = self.prior.sqrtprecTimesMean
 
         # pre-computations
         self.n = self.prior.dim
-        self.b_tild = np.hstack([L@likelihood.data for (L, likelihood) in zip(L1, self.likelihoods)]+ [L2mu]) 
-
-        callability = [callable(likelihood.model) for likelihood in self.likelihoods]
-        notcallability = [not c for c in callability]
-        if all(notcallability):
-            self.M = sp.sparse.vstack([L@likelihood.model for (L, likelihood) in zip(L1, self.likelihoods)] + [L2])
-        elif all(callability):
+        bounds = np.cumsum([0] + [len(likelihood.data) for likelihood in self.likelihoods]) # Boundaries of each likelihood block
+        self.b_tild = np.empty(bounds[-1] + len(L2mu), dtype=dtype)
+        for (L, likelihood, idx_start, idx_end) in zip(L1, self.likelihoods, bounds[:-1], bounds[1:]):
+            self.b_tild[idx_start:idx_end] = L@likelihood.data
+        self.b_tild[bounds[-1]:] = L2mu
+        self._y_buf = np.empty_like(self.b_tild) # Perturbed data, refilled every step
+        self._x0_buf = np.empty(self.n, dtype=dtype) # Initial guess of the inner solver, refilled every step
+        self._precond = None # Jacobi preconditioner for PCGLS. Computed on first use
+        self._solver = None # Inner solver. Built on first use and reused across steps
+        self._solver_settings = None
+        self._block_samples = None
+
+        num_callable = sum(callable(likelihood.model) for likelihood in self.likelihoods)
+        if num_callable == 0:
+            # CSR for fast products with M. The transpose is also stored in CSR (row) format for fast products with M^T
+            self.M = sp.sparse.vstack([sp.sparse.csr_matrix(L@likelihood.model) for (L, likelihood) in zip(L1, self.likelihoods)] + [sp.sparse.csr_matrix(L2)], format='csr', dtype=dtype)
+            self._MT = self.M.T.tocsr()
+            self._M_block = lambda X: self.M@X
+            self._MT_block = lambda Y: self._MT@Y
+        elif num_callable == len(self.likelihoods):
             # in this case, model is a function doing forward and backward operations
-            def M(x, flag):
-                if flag == 1:
-                    out1 = [L @ likelihood.model.forward(x) for (L, likelihood) in zip(L1, self.likelihoods)]
-                    out2 = L2 @ x
-                    out  = np.hstack(out1 + [out2])
-                elif flag == 2:
-                    idx_start = 0
-                    idx_end = 0
-                    out1 = np.zeros(self.n)
-                    for likelihood in self.likelihoods:
-                        idx_end += len(likelihood.data)
-                        out1 += likelihood.model.adjoint(likelihood.distribution.sqrtprec.T@x[idx_start:idx_end])
-                        idx_start = idx_end
-                    out2 = L2.T @ x[idx_end:]
-                    out  = out1 + out2                
-                return out   
+            # Operators are looked up once here instead of in every call. Products use .dot directly to skip the @ operator dispatch
+            L1T = [_as_csr_if_sparse(L.T) for L in L1]
+            L2T = _as_csr_if_sparse(L2.T)
+            models = [likelihood.model for likelihood in self.likelihoods]
+            n = self.n
+            if len(models) == 1:
+                # Single likelihood (the common Posterior case). No loops over likelihoods in the inner solver
+                (L,), (LT,), (model,), m = L1, L1T, models, bounds[1]
+                def M(x, flag):
+                    if flag == 1:
+                        out = np.empty(m + L2.shape[0], dtype=dtype) # Fresh output so callers may keep the result
+                        out[:m] = L.dot(model.forward(x))
+                        out[m:] = L2.dot(x)
+                    elif flag == 2:
+                        out = model.adjoint(LT.dot(x[:m])).astype(dtype, copy=False) + L2T.dot(x[m:])
+                    return out
+            else:
+                def M(x, flag):
+                    if flag == 1:
+                        out = np.empty(bounds[-1] + L2.shape[0], dtype=dtype) # Fresh output so callers may keep the result
+                        for (L, model, idx_start, idx_end) in zip(L1, models, bounds[:-1], bounds[1:]):
+                            out[idx_start:idx_end] = L.dot(model.forward(x))
+                        out[bounds[-1]:] = L2.dot(x)
+                    elif flag == 2:
+                        out1 = np.zeros(n, dtype=dtype)
+                        for (LT, model, idx_start, idx_end) in zip(L1T, models, bounds[:-1], bounds[1:]):
+                            out1 += model.adjoint(LT.dot(x[idx_start:idx_end]))
+                        out2 = L2T.dot(x[bounds[-1]:])
+                        out  = out1 + out2                
+                    return out   
             self.M = M  
+
+            # Versions of M applied to all columns of a matrix. Models are applied column by column
+            def M_block(X):
+                out = np.empty((bounds[-1] + L2.shape[0], X.shape[1]), dtype=dtype)
+                for (L, model, idx_start, idx_end) in zip(L1, models, bounds[:-1], bounds[1:]):
+                    out[idx_start:idx_end] = L.dot(np.column_stack([model.forward(x) for x in X.T]))
+                out[bounds[-1]:] = L2.dot(X)
+                return out
+            def MT_block(Y):
+                out1 = np.zeros((n, Y.shape[1]), dtype=dtype)
+                for (LT, model, idx_start, idx_end) in zip(L1T, models, bounds[:-1], bounds[1:]):
+                    out1 += np.column_stack([model.adjoint(y) for y in LT.dot(Y[idx_start:idx_end]).T])
+                return out1 + L2T.dot(Y[bounds[-1]:])
+            self._M_block = M_block
+            self._MT_block = MT_block
         else:
             raise TypeError("All likelihoods need to be callable or none need to be callable.")
 
+    def _check_explicit_operator(self):
+        """ Raise an error if the blocks of M are not available as matrices. The Jacobi preconditioner needs them, and probing a callable model for its matrix costs a forward solve per unknown. """
+        if callable(self.M) and any(getattr(likelihood.model, "_matrix", None) is None for likelihood in self.likelihoods):
+            raise ValueError("Inner solver 'PCGLS' requires the forward models to be given as matrices (or LinearModels defined by a matrix). Use 'CGLS' for models given by functions.")
+
+    def _jacobi_preconditioner(self):
+        """ Diagonal preconditioner holding the column norms of M, i.e. the square root of the diagonal of M^T M. """
+        self._check_explicit_operator()
+        if callable(self.M): # Blocks of M are formed from the matrices stored by the models
+            M_blocks = [likelihood.distribution.sqrtprec@likelihood.model._matrix for likelihood in self.likelihoods] + [self.prior.sqrtprec]
+        else:
+            M_blocks = [self.M]
+        diag_MtM = sum(_column_norms_squared(block) for block in M_blocks)
+        return sp.sparse.diags(np.sqrt(np.maximum(diag_MtM, np.finfo(float).eps)), format='csc')
+
+    def _build_solver(self):
+        """ Build the inner solver acting on the perturbed data and initial guess buffers. """
+        if self.inner_solver == "PCGLS":
+            if self._precond is None:
+                self._precond = self._jacobi_preconditioner()
+            return PCGLS(self.M, self._y_buf, self._x0_buf, self._precond, self.maxit, self.tol)
+        return CGLS(self.M, self._y_buf, self._x0_buf, self.maxit, self.tol)
+
+    def _solver_settings_key(self):
+        """ Settings that the inner solver depends on. The solver is rebuilt if any of them change. """
+        return (self.inner_solver, self.maxit, self.tol)
+
+    def _get_solver(self):
+        """ Return the inner solver. It is built once and reused across steps while its settings are unchanged. """
+        settings = self._solver_settings_key()
+        if self._solver is None or self._solver_settings != settings:
+            self._solver = self._build_solver()
+            self._solver_settings = settings
+        return self._solver
+
+    def _next_block_sample(self):
+        """ Return the next sample of the current block. A new block of block_size samples is drawn when the current one is used up. """
+        if self._block_samples is None or self._block_index == self.block_size:
+            # Row j of the noise matches the j-th draw of len(b_tild) normals, as when drawing the samples one at a time
+            Y = np.random.randn(self.block_size, len(self.b_tild)).T
+            Y += self.b_tild[:, None] # Perturbed data formed in place in the noise array
+            Y = Y.astype(self.dtype, copy=False)
+            X0 = np.repeat(np.asarray(self.current_point, dtype=self.dtype)[:, None], self.block_size, axis=1)
+            self._block_samples = _block_cgls(self._M_block, self._MT_block, Y, X0, self.maxit, self.tol)
+            self._block_index = 0
+        sample = self._block_samples[:, self._block_index].copy()
+        self._block_index += 1
+        return sample
+
     def step(self):
-        y = self.b_tild + np.random.randn(len(self.b_tild))
-        sim = CGLS(self.M, y, self.current_point, self.maxit, self.tol)            
-        self.current_point, _ = sim.solve()
+        if self.block_size > 1:
+            self.current_point = self._next_block_sample()
+        else:
+            np.add(self.b_tild, np.random.randn(len(self.b_tild)), out=self._y_buf)
+            self._x0_buf[:] = self.current_point
+            self.current_point, _ = self._get_solver().solve()
         acc = 1
         return acc
 
@@ -189,6 +331,76 @@ class LinearRTONew(SamplerNew):
         if not hasattr(self.prior, "sqrtprecTimesMean"):
             raise TypeError("Prior must contain a sqrtprecTimesMean attribute")
 
+def _power_iteration_norm(matvec, rmatvec, n, maxit=100, tol=1e-6):
+    """ Estimate the spectral norm of a linear operator by power iteration on its normal operator.
+
+    The start vector is drawn from a generator seeded with config.DEFAULT_SEED, so the global random state is not consumed.
+    Iteration stops when the relative change of the estimate drops below tol, or after maxit iterations.
+    """
+    v = np.random.default_rng(cuqi.config.DEFAULT_SEED).standard_normal(n)
+    v /= np.linalg.norm(v)
+    norm_sq = 0
+    for _ in range(maxit):
+        w = rmatvec(matvec(v))
+        norm_sq_new = np.linalg.norm(w) # ||M^T M v|| for unit v approaches the largest eigenvalue of M^T M from below
+        if norm_sq_new == 0:
+            break
+        v = w/norm_sq_new
+        converged = abs(norm_sq_new - norm_sq) <= tol*norm_sq_new
+        norm_sq = norm_sq_new
+        if converged:
+            break
+    return np.sqrt(norm_sq)
+
+def _block_cgls(A, AT, B, X0, maxit, tol):
+    """ Solve the least squares problems min ||A x - b||^2 for all columns b of B by CGLS run on all columns at once.
+
+    A and AT apply the operator and its transpose to all columns of a matrix. Each column follows the iterates of
+    cuqi.solver.CGLS (with zero shift) and is frozen once it meets the same convergence criteria. Returns the solutions as columns.
+    """
+    X = X0.copy()
+    R = B - A(X)
+    S = AT(R)
+    P = S.copy()
+    norms0 = np.linalg.norm(S, axis=0)
+    gamma = norms0**2
+    active = np.ones(B.shape[1], dtype=bool)
+
+    for _ in range(int(maxit)):
+        Q = A(P)
+        delta = np.linalg.norm(Q, axis=0)**2
+        delta[delta == 0] = np.finfo(float).eps
+        alpha = np.where(active, gamma/delta, 0) # Converged columns are not updated
+
+        X += alpha*P
+        R -= alpha*Q
+        S = AT(R)
+
+        norms = np.linalg.norm(S, axis=0)
+        gamma_new = norms**2
+        beta = np.divide(gamma_new, gamma, out=np.zeros_like(gamma), where=active & (gamma > 0))
+        P = S + beta*P
+        gamma = np.where(active, gamma_new, gamma)
+
+        normx = np.linalg.norm(X, axis=0)
+        active &= ~((norms <= norms0*tol) | (normx*tol >= 1))
+        if not np.any(active):
+            break
+
+    return X
+
+def _as_csr_if_sparse(A):
+    """ Convert a sparse matrix to CSR format, which has the fastest matrix-vector product. Dense arrays are returned as is. """
+    if sp.sparse.issparse(A):
+        return A.tocsr()
+    return A
+
+def _column_norms_squared(A):
+    """ Squared Euclidean norms of the columns of a dense or sparse matrix. """
+    if sp.sparse.issparse(A):
+        return np.asarray(A.multiply(A).sum(axis=0)).ravel()
+    return np.sum(np.asarray(A)**2, axis=0)
+
 class RegularizedLinearRTONew(LinearRTONew):
     """
     Regularized Linear RTO (Randomize-Then-Optimize) sampler.
@@ -235,6 +447,12 @@ class RegularizedLinearRTONew(LinearRTONew):
         self._stepsize = self._choose_stepsize()
         self.maxit = maxit
 
+    @LinearRTONew.block_size.setter
+    def block_size(self, value):
+        if value != 1:
+            raise ValueError("Drawing samples in blocks is not supported for RegularizedLinearRTONew. Use block_size=1.")
+        super(RegularizedLinearRTONew, type(self)).block_size.fset(self, value)
+
     @LinearRTONew.target.setter
     def target(self, value):
         if not callable(value.prior.proximal):
@@ -245,11 +463,11 @@ class RegularizedLinearRTONew(LinearRTONew):
         if isinstance(self.stepsize, str):
             if self.stepsize in ["automatic"]:
                 if not callable(self.M):
-                    M_op = scipyLinearOperator(self.M.shape, matvec = lambda v: self.M@v, rmatvec = lambda w: self.M.T@w)
+                    matvec, rmatvec = lambda v: self.M@v, lambda w: self._MT@w
                 else:
-                    M_op = scipyLinearOperator((len(self.b_tild), self.n), matvec = lambda v: self.M(v,1), rmatvec = lambda w: self.M(w,2))
+                    matvec, rmatvec = lambda v: self.M(v,1), lambda w: self.M(w,2)
                     
-                _stepsize = 0.99/(estimate_spectral_norm(M_op)**2)
+                _stepsize = 0.99/(_power_iteration_norm(matvec, rmatvec, self.n)**2)
                 # print(f"Estimated stepsize for regularized Linear RTO: {_stepsize}")
             else:
                 raise ValueError("Stepsize choice not supported")
@@ -261,10 +479,9 @@ class RegularizedLinearRTONew(LinearRTONew):
     def prior(self):
         return self.target.prior.gaussian
 
-    def step(self):
-        y = self.b_tild + np.random.randn(len(self.b_tild))
-        sim = FISTA(self.M, y, self.current_point, self.proximal,
-                    maxit = self.maxit, stepsize = self._stepsize, abstol = self.abstol, adaptive = self.adaptive)         
-        self.current_point, _ = sim.solve()
-        acc = 1
-        return acc
+    def _build_solver(self):
+        return FISTA(self.M, self._y_buf, self._x0_buf, self.proximal,
+                     maxit = self.maxit, stepsize = self._stepsize, abstol = self.abstol, adaptive = self.adaptive)
+
+    def _solver_settings_key(self):
+        return (self.proximal, self.maxit, self._stepsize, self.abstol, self.adaptive)
@@ -1,24 +1,75 @@
 from abc import ABC, abstractmethod
 import os
 import numpy as np
-import pickle as pkl
 import warnings
 import cuqi
 from cuqi.samples import Samples
 
 try:
-    from progressbar import progressbar
+    from progressbar import ProgressBar
 except ImportError:
-    def progressbar(iterable, **kwargs):
+    ProgressBar = None
+
+def _progress_range(N, num_updates=200):
+    """ Iterate over range(N) while showing a progress bar.
+
+    The progress bar is only updated every N//num_updates iterations to keep its overhead out of the sampling loop.
+    """
+    if ProgressBar is None:
         warnings.warn("Module mcmc: Progressbar not found. Install progressbar2 to get sampling progress.")
-        return iterable
+        yield from range(N)
+        return
+
+    update_interval = max(N // num_updates, 1)
+    bar = ProgressBar(max_value=N)
+    bar.start()
+    for idx in range(N):
+        yield idx
+        if (idx + 1) % update_interval == 0:
+            bar.update(idx + 1)
+    bar.finish()
+
+_NPZ_MAGIC = b'PK\x03\x04' # .npz files are zip archives
+_CHECKPOINT_TYPES_KEY = '__types__'
+
+def _encode_checkpoint_value(name, value):
+    """ Convert a value of the sampler state to an array that can be saved without pickling. Returns the array and the name of the type to restore. """
+    if value is None:
+        return np.empty(0), 'none'
+    if isinstance(value, (list, tuple)):
+        array, type_name = np.asarray(value), type(value).__name__
+    elif isinstance(value, np.ndarray):
+        array, type_name = value.view(np.ndarray), 'ndarray'
+    elif isinstance(value, np.generic):
+        array, type_name = np.asarray(value), 'scalar'
+    elif isinstance(value, (bool, int, float, complex, str)):
+        array, type_name = np.asarray(value), 'builtin'
+    else:
+        raise TypeError(f"Cannot save '{name}' of type {type(value).__name__} in a sampler checkpoint.")
+    if array.dtype.hasobject:
+        raise TypeError(f"Cannot save '{name}' in a sampler checkpoint since it contains Python objects.")
+    return array, type_name
+
+def _decode_checkpoint_value(array, type_name):
+    """ Restore a value of the sampler state saved with :func:`_encode_checkpoint_value`. """
+    if type_name == 'none':
+        return None
+    if type_name == 'list':
+        return array.tolist()
+    if type_name == 'tuple':
+        return tuple(array.tolist())
+    if type_name == 'scalar':
+        return array[()]
+    if type_name == 'builtin':
+        return array.item()
+    return array
 
 class SamplerNew(ABC):
     """ Abstract base class for all samplers.
     
     Provides a common interface for all samplers. The interface includes methods for sampling, warmup and getting the samples in an object oriented way.
 
-    Samples are stored in a list to allow for dynamic growth of the sample set. Returning samples is done by creating a new Samples object from the list of samples.
+    Samples are stored in a preallocated contiguous array that grows geometrically when more samples are requested. Returning samples is done by creating a new Samples object viewing the filled part of that array.
 
     """
     _STATE_KEYS = {'current_point'}
@@ -107,26 +158,69 @@ class SamplerNew(ABC):
     # ------------ Public methods ------------
 
     def get_samples(self) -> Samples:
-        """ Return the samples. The internal data-structure for the samples is a dynamic list so this creates a copy. """
-        return Samples(np.array(self._samples).T, self.target.geometry)
+        """ Return the samples. The returned Samples object views the internal sample buffer, so no copy is made.
+
+        The buffer stores one sample per row, so the (dim, Ns) samples are an F-contiguous (transposed) view of it. """
+        return Samples(self._samples.T, self.target.geometry)
     
     def reset(self): # TODO. Issue here. Current point is not reset, and initial point is lost with this reset.
-        self._samples.clear()
-        self._acc.clear()
+        # Fresh buffers are allocated so Samples returned before the reset are not overwritten
+        self._samples = self._samples[:0]
+        self._acc = self._acc[:0]
     
     def save_checkpoint(self, path):
-        """ Save the state of the sampler to a file. """
+        """ Save the state of the sampler to a file.
+
+        The state is stored in numpy's .npz format with one array per entry of the state dictionary, e.g. 'state/current_point'.
+        Arrays are written as raw binary data and no entries are pickled, so loading a checkpoint does not execute arbitrary code.
+        Scalars, strings, None, lists and tuples are supported in addition to numeric arrays, and are restored with their original type.
+        The file is written to path as given, so a path ending with '.npz' is recommended.
+
+        Checkpoints written by earlier versions using pickle can still be loaded by :meth:`load_checkpoint`, but this is deprecated.
+        """
 
         state = self.get_state()
 
+        arrays = {}
+        types = []
+        for group in state:
+            for key, value in state[group].items():
+                name = f'{group}/{key}'
+                arrays[name], type_name = _encode_checkpoint_value(name, value)
+                types.append(f'{name}={type_name}')
+        arrays[_CHECKPOINT_TYPES_KEY] = np.array(types)
+
         with open(path, 'wb') as handle:
-            pkl.dump(state, handle, protocol=pkl.HIGHEST_PROTOCOL)
+            np.savez(handle, **arrays)
 
     def load_checkpoint(self, path):
-        """ Load the state of the sampler from a file. """
+        """ Load the state of the sampler from a file written by :meth:`save_checkpoint`.
+
+        Loading checkpoints written with pickle by earlier versions is deprecated. Such files are only loaded with a warning
+        since unpickling can execute arbitrary code; only load pickle checkpoints from trusted sources.
+        """
 
         with open(path, 'rb') as handle:
-            state = pkl.load(handle)
+            is_npz = handle.read(len(_NPZ_MAGIC)) == _NPZ_MAGIC
+
+        if not is_npz:
+            warnings.warn("Loading sampler checkpoints saved with pickle is deprecated and will be removed in a future release. "
+                          "Only load pickle checkpoints from trusted sources and save the sampler again with save_checkpoint "
+                          "to convert the checkpoint to the .npz format.", DeprecationWarning)
+            import pickle as pkl
+            with open(path, 'rb') as handle:
+                state = pkl.load(handle)
+            self.set_state(state)
+            return
+
+        state = {}
+        with np.load(path, allow_pickle=False) as data:
+            types = dict(entry.split('=', 1) for entry in data[_CHECKPOINT_TYPES_KEY].tolist())
+            for name in data.files:
+                if name == _CHECKPOINT_TYPES_KEY:
+                    continue
+                group, key = name.split('/', 1)
+                state.setdefault(group, {})[key] = _decode_checkpoint_value(data[name], types[name])
 
         self.set_state(state)
 
@@ -150,22 +244,28 @@ class SamplerNew(ABC):
         if batch_size > 0:
             batch_handler = _BatchHandler(batch_size, sample_path)
 
+        # Allocate storage for the new samples
+        self._reserve_history(Ns)
+        index_offset = self._num_samples # Index of the first new sample
+
+        # Bound methods used in the loop are looked up once
+        step, store_sample, call_callback = self.step, self._store_sample, self._call_callback
+
         # Draw samples
-        for _ in progressbar( range(Ns) ):
+        for idx in _progress_range(Ns):
             
             # Perform one step of the sampler
-            acc = self.step()
+            acc = step()
 
             # Store samples
-            self._acc.append(acc)
-            self._samples.append(self.current_point)
+            store_sample(acc)
 
             # Add sample to batch
             if batch_size > 0:
                 batch_handler.add_sample(self.current_point)
 
             # Call callback function if specified            
-            self._call_callback(self.current_point, len(self._samples)-1)
+            call_callback(self.current_point, index_offset + idx)
                 
         return self
     
@@ -185,22 +285,28 @@ class SamplerNew(ABC):
 
         tune_interval = max(int(tune_freq * Nb), 1)
 
+        # Allocate storage for the new samples
+        self._reserve_history(Nb)
+        index_offset = self._num_samples # Index of the first new sample
+
+        # Bound methods used in the loop are looked up once
+        step, tune, store_sample, call_callback = self.step, self.tune, self._store_sample, self._call_callback
+
         # Draw warmup samples with tuning
-        for idx in progressbar(range(Nb)):
+        for idx in _progress_range(Nb):
 
             # Perform one step of the sampler
-            acc = self.step()
+            acc = step()
 
             # Tune the sampler at tuning intervals
             if (idx + 1) % tune_interval == 0:
-                self.tune(tune_interval, idx // tune_interval) 
+                tune(tune_interval, idx // tune_interval) 
 
             # Store samples
-            self._acc.append(acc)
-            self._samples.append(self.current_point)
+            store_sample(acc)
 
             # Call callback function if specified
-            self._call_callback(self.current_point, len(self._samples)-1)
+            call_callback(self.current_point, index_offset + idx)
 
         return self
     
@@ -290,8 +396,42 @@ class SamplerNew(ABC):
             else:
                 raise ValueError(f"Key {key} not recognized in history dictionary of sampler {self.__class__.__name__}.")
 
+    # ------------ Private attributes ------------
+
+    @property
+    def _samples(self):
+        """ The samples drawn so far (one sample per row). View of the filled part of the sample buffer. """
+        return self._samples_buffer[:self._num_samples]
+
+    @_samples.setter
+    def _samples(self, value):
+        self._samples_buffer = _as_history_buffer(value)
+        self._num_samples = len(self._samples_buffer)
+
+    @property
+    def _acc(self):
+        """ The acceptance indicators of the samples drawn so far. View of the filled part of the acceptance buffer. """
+        return self._acc_buffer[:self._num_acc]
+
+    @_acc.setter
+    def _acc(self, value):
+        self._acc_buffer = _as_history_buffer(value)
+        self._num_acc = len(self._acc_buffer)
+
     # ------------ Private methods ------------
 
+    def _reserve_history(self, n):
+        """ Make room for n more entries in the sample and acceptance buffers. Buffers grow at least geometrically to keep repeated calls cheap. """
+        self._samples_buffer = _grow_buffer(self._samples_buffer, self._num_samples + n)
+        self._acc_buffer = _grow_buffer(self._acc_buffer, self._num_acc + n)
+
+    def _store_sample(self, acc):
+        """ Store the current point and its acceptance indicator in the preallocated buffers. """
+        self._acc_buffer[self._num_acc] = acc
+        self._num_acc += 1
+        self._samples_buffer[self._num_samples] = self.current_point
+        self._num_samples += 1
+
     def _call_callback(self, sample, sample_index):
         """ Calls the callback function. Assumes input is sample and sample index"""
         if self.callback is not None:
@@ -354,6 +494,20 @@ class ProposalBasedSamplerNew(SamplerNew, ABC):
             return cuqi.geometry._DefaultGeometry(self.dim)
 
 
+def _as_history_buffer(value):
+    """ Convert a sequence of history entries to a new floating point buffer. """
+    value = np.asarray(value)
+    return np.array(value, dtype=np.result_type(value.dtype, np.float64))
+
+def _grow_buffer(buffer, size):
+    """ Return buffer if it can hold size entries. Otherwise return a larger copy with capacity max(2*len(buffer), size). """
+    if size <= len(buffer):
+        return buffer
+    new_buffer = np.empty((max(2*len(buffer), size),) + buffer.shape[1:], dtype=buffer.dtype)
+    new_buffer[:len(buffer)] = buffer
+    return new_buffer
+
+
 class _BatchHandler:
     """ Utility class to handle batching of samples. 
     
@@ -370,7 +524,8 @@ class _BatchHandler:
 
         self.sample_path = sample_path
         self._batch_size = batch_size
-        self.current_batch = []
+        self._batch_buffer = None # Allocated on first sample, when the sample shape is known
+        self._num_in_batch = 0
         self.num_batches_dumped = 0
 
     @property
@@ -390,30 +545,41 @@ class _BatchHandler:
                 raise ValueError(f"Could not create directory at {normalized_path}: {e}")
         self._sample_path = normalized_path
 
+    @property
+    def current_batch(self):
+        """ The samples in the current batch that have not yet been saved to disk. """
+        if self._batch_buffer is None:
+            return np.empty((0,))
+        return self._batch_buffer[:self._num_in_batch]
+
     def add_sample(self, sample):
         """ Add a sample to the batch if batching. If the batch is full, flush the batch to disk. """
 
         if self._batch_size <= 0:
             return  # Batching not used
 
-        self.current_batch.append(sample)
+        if self._batch_buffer is None:
+            sample = np.asarray(sample)
+            self._batch_buffer = np.empty((self._batch_size,) + sample.shape, dtype=np.result_type(sample.dtype, np.float64))
+
+        self._batch_buffer[self._num_in_batch] = sample
+        self._num_in_batch += 1
 
-        if len(self.current_batch) >= self._batch_size:
+        if self._num_in_batch >= self._batch_size:
             self.flush()
 
     def flush(self):
         """ Flush the current batch of samples to disk. """
 
-        if not self.current_batch:
+        if self._num_in_batch == 0:
             return  # No samples to flush
 
         # Save the current batch of samples
-        batch_samples = np.array(self.current_batch)
         file_path = f'{self.sample_path}batch_{self.num_batches_dumped:04d}.npz'
-        np.savez(file_path, samples=batch_samples, batch_id=self.num_batches_dumped)
+        np.savez(file_path, samples=self.current_batch, batch_id=self.num_batches_dumped)
 
         self.num_batches_dumped += 1
-        self.current_batch = []  # Clear the batch after saving
+        self._num_in_batch = 0  # Clear the batch after saving. The buffer is reused for the next batch
 
     def finalize(self):
         """ Finalize the batch handler. Flush any remaining samples to disk. """
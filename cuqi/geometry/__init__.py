@@ -25,3 +25,8 @@ def _get_identity_geometries():
     These geometries do not alter the gradient computations.
     """
     return _identity_geometries
+
+def _is_identity_vector_geometry(geometry):
+    """ Returns True if `geometry` has identity `par2fun` and `fun2par` methods acting on 1D arrays, such that parameters can be used directly as function values and vice versa. """
+    return type(geometry) in _get_identity_geometries() and \
+        geometry.fun_shape == geometry.par_shape
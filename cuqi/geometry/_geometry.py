@@ -14,7 +14,10 @@ class Geometry(ABC):
     """A class that represents the geometry of the range, domain, observation, or other sets.
 
     It specifies a mapping from the parameter space to the function space (:meth:`par2fun`) and the inverse map if possible (:meth:`fun2par`). The parameters can be for example, the center and width of a hat function, and the function is the resulting hat function evaluated at grid points of a given grid. The geometry keeps track of the dimension and shape of the parameter space (:meth:`par_dim` and :meth:`par_shape`) and the dimension and shape of the function space (:meth:`fun_dim` and :meth:`fun_shape`).
+
+    Geometries with expensive :meth:`par2fun` or :meth:`fun2par` maps can set the class attribute `cache_transforms` to True. :class:`~cuqi.array.CUQIarray` then caches the function values and parameters computed with the geometry until the data or the geometry changes.
     """
+    cache_transforms = False
     @property
     @abstractmethod
     def par_shape(self):
@@ -2,13 +2,16 @@ from __future__ import annotations
 import numpy as np
 from scipy.sparse import csc_matrix
 from scipy.sparse import hstack
+from scipy.sparse import issparse
 from scipy.linalg import solve
 from cuqi.samples import Samples
 from cuqi.array import CUQIarray
-from cuqi.geometry import Geometry, _DefaultGeometry1D, _DefaultGeometry2D, _get_identity_geometries
+from cuqi.geometry import Geometry, _DefaultGeometry1D, _DefaultGeometry2D, _get_identity_geometries, _is_identity_vector_geometry
 import cuqi
 import matplotlib.pyplot as plt
 from copy import copy
+import os
+from concurrent.futures import ThreadPoolExecutor
 
 class Model(object):
     """Generic model defined by a forward operator.
@@ -112,6 +115,10 @@ class Model(object):
         #Store forward func
         self._forward_func = forward
         self._gradient_func = gradient
+
+        # Whether the forward function can be applied to a 2D array holding
+        # one input per column (e.g. a matrix product)
+        self._forward_accepts_2d = False
          
         #Store range_geometry
         if isinstance(range_geometry, tuple) and len(range_geometry) == 2:
@@ -140,13 +147,33 @@ class Model(object):
         # Store non_default_args of the forward operator for faster caching when checking for those arguments.
         self._non_default_args = cuqi.utilities.get_non_default_args(self._forward_func)
 
+    @property
+    def range_geometry(self):
+        return self._range_geometry
+
+    @range_geometry.setter
+    def range_geometry(self, value):
+        self._range_geometry = value
+        # Cache dimension to avoid recomputing it on every access
+        self._range_dim = value.par_dim
+
+    @property
+    def domain_geometry(self):
+        return self._domain_geometry
+
+    @domain_geometry.setter
+    def domain_geometry(self, value):
+        self._domain_geometry = value
+        # Cache dimension to avoid recomputing it on every access
+        self._domain_dim = value.par_dim
+
     @property
     def domain_dim(self): 
-        return self.domain_geometry.par_dim
+        return self._domain_dim
 
     @property
     def range_dim(self): 
-        return self.range_geometry.par_dim
+        return self._range_dim
 
     def _2fun(self, x, geometry, is_par):
         """ Converts `x` to function values (if needed) using the appropriate 
@@ -174,8 +201,9 @@ class Model(object):
         """
         # Convert to function representation
         # if x is CUQIarray and geometry are consistent, we obtain funvals
-        # directly
-        if isinstance(x, CUQIarray) and  x.geometry == geometry:
+        # directly (the identity check avoids comparing geometry values)
+        if isinstance(x, CUQIarray) and \
+            (x.geometry is geometry or x.geometry == geometry):
             x = x.funvals
         # Otherwise we use the geometry par2fun method
         elif is_par:
@@ -210,8 +238,9 @@ class Model(object):
         """
         # Convert to parameters
         # if val is CUQIarray and geometry are consistent, we obtain parameters
-        # directly
-        if isinstance(val, CUQIarray) and val.geometry == geometry:
+        # directly (the identity check avoids comparing geometry values)
+        if isinstance(val, CUQIarray) and \
+            (val.geometry is geometry or val.geometry == geometry):
             val = val.parameters
         # Otherwise we use the geometry fun2par method
         elif not is_par:
@@ -225,7 +254,7 @@ class Model(object):
         return val
         
 
-    def _apply_func(self, func, func_range_geometry, func_domain_geometry, x, is_par, **kwargs):
+    def _apply_func(self, func, func_range_geometry, func_domain_geometry, x, is_par, accepts_2d=False, n_jobs=1, **kwargs):
         """ Private function that applies the given function `func` to the input value `x`. It converts the input to function values (if needed) using the given `func_domain_geometry` and converts the output function values to parameters using the given `func_range_geometry`. It additionally handles the case of applying the function `func` to the cuqi.samples.Samples object.
 
         kwargs are keyword arguments passed to the functions `func`.
@@ -248,22 +277,43 @@ class Model(object):
             If True the input is assumed to be parameters.
             If False the input is assumed to be function values.
 
+        accepts_2d : bool
+            If True, `func` can be applied to a 2D array holding one input
+            per column. Samples are then passed to `func` all at once when
+            no geometry conversion is needed.
+
+        n_jobs : int
+            Number of threads used to apply `func` to the samples when `x`
+            is a cuqi.samples.Samples object. If -1, all CPUs are used.
+
         Returns
         -------
         ndarray or cuqi.array.CUQIarray
             The output of the function `func` converted to parameters.
         """ 
-        # If input x is Samples we apply func for each sample
-        # TODO: Check if this can be done all-at-once for computational speed-up
         if isinstance(x,Samples):
-            out = np.zeros((func_range_geometry.par_dim, x.Ns))
-            # Recursively apply func to each sample
-            for idx, item in enumerate(x):
-                out[:,idx] = self._apply_func(func,
-                                              func_range_geometry,
-                                              func_domain_geometry,
-                                              item, is_par=True,
-                                              **kwargs)
+            # Apply func to all samples at once if possible
+            if accepts_2d and \
+                _is_identity_vector_geometry(func_domain_geometry) and \
+                _is_identity_vector_geometry(func_range_geometry):
+                out = func(x.samples, **kwargs)
+                return Samples(out, geometry=func_range_geometry)
+
+            # Otherwise we apply func for each sample (given as parameters)
+            # and write the output parameters into the preallocated array
+            out = np.empty((func_range_geometry.par_dim, x.Ns))
+            to_fun, to_par = self._2fun, self._2par
+            def apply(item):
+                item = to_fun(item, func_domain_geometry, is_par=True)
+                return to_par(func(item, **kwargs), func_range_geometry)
+            if n_jobs == 1:
+                for idx, item in enumerate(x):
+                    out[:,idx] = apply(item)
+            else:
+                max_workers = os.cpu_count() if n_jobs == -1 else n_jobs
+                with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                    for idx, val in enumerate(executor.map(apply, x)):
+                        out[:,idx] = val
             return Samples(out, geometry=func_range_geometry)
         
         # store if input x is CUQIarray
@@ -294,7 +344,7 @@ class Model(object):
 
         return kwargs
         
-    def forward(self, *args, is_par=True, **kwargs):
+    def forward(self, *args, is_par=True, n_jobs=1, **kwargs):
         """ Forward function of the model.
         
         Forward converts the input to function values (if needed) using the domain geometry of the model.
@@ -308,7 +358,16 @@ class Model(object):
         is_par : bool
             If True the input is assumed to be parameters.
             If False the input is assumed to be function values.
-        
+
+        n_jobs : int
+            Number of threads used to evaluate the forward operator when the
+            input is a cuqi.samples.Samples object. If -1, all CPUs are used.
+            Threads only give a speed-up if the forward operator spends its
+            time in code that releases the GIL (e.g. NumPy, BLAS or SciPy
+            sparse routines), and the forward operator must be thread-safe.
+            Forward operators of :class:`PDEModel` store the assembled PDE
+            and should be evaluated with n_jobs=1.
+
         **kwargs : keyword arguments for model input.
             Keywords must match the names of the non_default_args of the model.
 
@@ -343,7 +402,9 @@ class Model(object):
         return self._apply_func(self._forward_func,
                                 self.range_geometry,
                                 self.domain_geometry,
-                                x, is_par)
+                                x, is_par,
+                                accepts_2d=self._forward_accepts_2d,
+                                n_jobs=n_jobs)
 
     def __call__(self, *args, **kwargs):
         return self.forward(*args, **kwargs)
@@ -488,15 +549,24 @@ class LinearModel(Model):
     :meth:`range_dim` the dimension of the range.
     :meth:`domain_dim` the dimension of the domain.
     :meth:`get_matrix` returns an ndarray with the matrix representing the forward operator.
+    :meth:`get_sparse_matrix` returns the matrix representing the forward operator in sparse CSC format.
     """
     # Linear forward model with forward and adjoint (transpose).
     
     def __init__(self,forward,adjoint=None,range_geometry=None,domain_geometry=None):
         #Assume forward is matrix if not callable (TODO: add more checks)
         if not callable(forward):      
-            forward_func = lambda x: self._matrix@x
-            adjoint_func = lambda y: self._matrix.T@y
             matrix = forward
+            # Sparse formats without compiled matrix products (e.g. LIL, DOK
+            # or COO) are converted once instead of on every product
+            if issparse(matrix) and matrix.format not in ('csr', 'csc', 'bsr', 'dia'):
+                matrix = matrix.tocsr()
+            # The matrix and its transpose are bound as defaults so each
+            # product avoids attribute lookups and re-creating the transpose.
+            # A sparse transpose is stored in CSR format (row-wise products).
+            matrix_T = matrix.T.tocsr() if issparse(matrix) else matrix.T
+            forward_func = lambda x, _M=matrix: _M@x
+            adjoint_func = lambda y, _MT=matrix_T: _MT@y
         else:
             forward_func = forward
             adjoint_func = adjoint
@@ -521,6 +591,11 @@ class LinearModel(Model):
 
         #Store matrix privately
         self._matrix = matrix
+        self._sparse_matrix = None
+
+        # Matrix products act column-wise on 2D arrays
+        self._forward_accepts_2d = matrix is not None
+        self._adjoint_accepts_2d = matrix is not None
 
         #Add gradient
         self._gradient_func = lambda direction, wrt: self._adjoint_func(direction)
@@ -548,29 +623,37 @@ class LinearModel(Model):
         return self._apply_func(self._adjoint_func,
                                 self.domain_geometry,
                                 self.range_geometry,
-                                y, is_par)
+                                y, is_par,
+                                accepts_2d=self._adjoint_accepts_2d)
 
 
     def get_matrix(self):
+        """ Returns the matrix representing the forward operator. If the model was defined by a matrix it is returned as-is, otherwise the matrix is computed (once) in sparse format by applying the forward operator to unit vectors. """
         if self._matrix is not None: #Matrix exists so return it
             return self._matrix
         else:
-            #TODO: Can we compute this faster while still in sparse format?
-            mat = csc_matrix((self.range_dim,0)) #Sparse (m x 1 matrix)
-            e = np.zeros(self.domain_dim)
-            
-            # Stacks sparse matrices on csc matrix
-            for i in range(self.domain_dim):
-                e[i] = 1
-                col_vec = self.forward(e)
-                mat = hstack((mat,col_vec[:,None])) #mat[:,i] = self.forward(e)
-                e[i] = 0
+            # Probe the forward operator with blocks of unit vectors. Models
+            # whose forward accepts 2D input evaluate each block in a single
+            # call. The block size bounds the memory of the dense probes.
+            block_size = 512
+            n = self.domain_dim
+            blocks = []
+            for start in range(0, n, block_size):
+                E = np.eye(n, min(block_size, n-start), -start)
+                cols = self.forward(Samples(E)).samples
+                blocks.append(csc_matrix(cols))
 
             #Store matrix for future use
-            self._matrix = mat
+            self._matrix = hstack(blocks, format='csc')
 
             return self._matrix
 
+    def get_sparse_matrix(self):
+        """ Returns the matrix representing the forward operator in sparse CSC format. The sparse matrix is computed once and cached, so callers relying on sparse matrix-vector products should use this instead of converting the output of :meth:`get_matrix` on every call. """
+        if self._sparse_matrix is None:
+            self._sparse_matrix = csc_matrix(self.get_matrix())
+        return self._sparse_matrix
+
     def __matmul__(self, x):
         return self.forward(x)
 
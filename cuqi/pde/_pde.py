@@ -1,5 +1,6 @@
 from abc import ABC, abstractmethod
 import scipy
+import scipy.sparse
 from inspect import getsource
 from scipy.interpolate import interp1d
 import numpy as np
@@ -244,30 +245,56 @@ class TimeDependentLinearPDE(LinearPDE):
 
     def solve(self):
         """Solve PDE by time-stepping"""
-        # initialize time-dependent solution
+        # initialize time-dependent solution. The solution is stored time
+        # step by time step so each step reads and writes contiguous memory,
+        # and it is returned with time along the last axis.
         self.assemble_step(self.time_steps[0])
-        u = np.empty((len(self.initial_condition), len(self.time_steps)))
-        u[:, 0] = self.initial_condition
+        u = np.empty((len(self.time_steps), len(self.initial_condition)))
+        u[0] = self.initial_condition
+
+        # The time stepping operator is reused while the time step size and
+        # the assembled differential operator (same object) are unchanged.
+        # Only the last operator is kept, so memory does not grow with the
+        # number of distinct time step sizes
+        step_op, step_dt, step_diff_op = None, None, None
+        eye = None
+        dts = np.diff(self.time_steps)
+        assemble_step = self.assemble_step
 
         if self.method == 'forward_euler':
-            for idx, t in enumerate(self.time_steps[:-1]):
-                dt = self.time_steps[idx+1] - t
-                self.assemble_step(t)
-                u_pre = u[:, idx]
-                u[:, idx+1] = (dt*self.diff_op + np.eye(len(u_pre)))@u_pre + dt*self.rhs  # from u at time t, gives u at t+dt
+            for idx, (t, dt) in enumerate(zip(self.time_steps[:-1], dts)):
+                assemble_step(t)
+                u_pre = u[idx]
+                if self.diff_op is not step_diff_op:
+                    step_dt, step_diff_op = None, self.diff_op
+                    eye = self._identity_like(self.diff_op, len(u_pre))
+                if dt != step_dt:
+                    step_op, step_dt = dt*self.diff_op + eye, dt
+                u[idx+1] = step_op@u_pre + dt*self.rhs  # from u at time t, gives u at t+dt
             info = None
 
         if self.method == 'backward_euler':
-            for idx, t in enumerate(self.time_steps[1:]):
-                dt = t - self.time_steps[idx]
-                self.assemble_step(t)
-                u_pre = u[:, idx]
-                A = np.eye(len(u_pre)) - dt*self.diff_op
+            for idx, (t, dt) in enumerate(zip(self.time_steps[1:], dts)):
+                assemble_step(t)
+                u_pre = u[idx]
+                if self.diff_op is not step_diff_op:
+                    step_dt, step_diff_op = None, self.diff_op
+                    eye = self._identity_like(self.diff_op, len(u_pre))
+                if dt != step_dt:
+                    step_op, step_dt = eye - dt*self.diff_op, dt
+                A = step_op
                 # from u at time t-dt, gives u at t
-                u[:, idx+1], info = self._solve_linear_system(
+                u[idx+1], info = self._solve_linear_system(
                     A, u_pre + dt*self.rhs, self._linalg_solve, self._linalg_solve_kwargs)
 
-        return u, info
+        return u.T, info
+
+    @staticmethod
+    def _identity_like(diff_op, n):
+        """Returns an `n` by `n` identity matrix in sparse format if `diff_op` is sparse and as a dense array otherwise."""
+        if scipy.sparse.issparse(diff_op):
+            return scipy.sparse.identity(n, format='csr')
+        return np.eye(n)
 
     def observe(self, solution):
 
@@ -4,8 +4,8 @@ from cuqi.diagnostics import Geweke
 from cuqi.geometry import _DefaultGeometry1D, Continuous2D, Image2D
 from cuqi.array import CUQIarray
 from cuqi.utilities import force_ndarray
-from copy import copy
 from numbers import Number
+from functools import lru_cache
 
 try:
     import arviz  # Plotting tool
@@ -24,6 +24,68 @@ def _check_for_arviz():
         raise ImportError(msg)
 
 
+@lru_cache(maxsize=128)
+def _percentile_indices(q, Ns):
+    """Return the lower and upper order statistic indices, interpolation
+    weights and partition indices for computing the percentiles `q` (tuple)
+    of `Ns` samples with linear interpolation. Cached since the same
+    percentiles (e.g. 95% credibility intervals) are typically computed for
+    many sample sets with the same number of samples."""
+    virtual = np.asarray(q, dtype=float)/100*(Ns-1)
+    lo = np.floor(virtual).astype(int)
+    hi = np.minimum(lo+1, Ns-1)
+    kth = np.unique(np.concatenate((lo, hi)))
+    return tuple(lo.tolist()), tuple(hi.tolist()), tuple((virtual-lo).tolist()), tuple(kth.tolist())
+
+
+def _percentile_last_axis(samples, q):
+    """Compute percentiles `q` of `samples` along the last axis using linear
+    interpolation (same as :func:`numpy.percentile`). Only the order
+    statistics needed for the interpolation are found, using a single call to
+    :func:`numpy.partition`. The percentiles are indexed by the first axis of
+    the output."""
+    samples = np.asarray(samples)
+    lo, hi, weights, kth = _percentile_indices(tuple(q), samples.shape[-1])
+    # Partition a C-ordered copy in-place such that the partition runs along
+    # the contiguous axis. Samples from the samplers are transposed views,
+    # i.e. F-contiguous, for which np.partition would work on strided data
+    part = np.array(samples, order='C')
+    part.partition(kth, axis=-1)
+
+    # Interpolate each percentile directly into a preallocated output using
+    # the same (monotonic) formula as numpy
+    out = np.empty((len(lo),) + part.shape[:-1],
+                   dtype=np.result_type(part.dtype, float))
+    for i, (l, h, t) in enumerate(zip(lo, hi, weights)):
+        a, b = part[..., l], part[..., h]
+        if t >= 0.5:
+            np.subtract(b, (b-a)*(1-t), out=out[i])
+        else:
+            np.add(a, (b-a)*t, out=out[i])
+    return out
+
+
+def _variance_last_axis(samples, mean, block_bytes=2**20):
+    """Compute the (biased) variance of `samples` along the last axis given
+    their `mean`, using the two-pass formula (same as :func:`numpy.var`).
+    The samples are processed in blocks of approximately `block_bytes` bytes
+    along the last axis, such that only a block-sized temporary of deviations
+    from the mean is allocated instead of one of the size of the samples."""
+    samples = np.asarray(samples)
+    Ns = samples.shape[-1]
+    dtype = np.result_type(samples.dtype, float)
+    mean = np.asarray(mean, dtype=dtype)[..., np.newaxis]
+
+    n_rows = max(1, samples.size//max(1, Ns))
+    block_size = max(1, block_bytes//(n_rows*np.dtype(dtype).itemsize))
+
+    sq_sum = np.zeros(samples.shape[:-1], dtype=dtype)
+    for start in range(0, Ns, block_size):
+        d = np.subtract(samples[..., start:start+block_size], mean, dtype=dtype)
+        sq_sum += np.einsum('...i,...i->...', d, d)
+    return sq_sum/Ns
+
+
 class Samples(object):
     """
     An object used to store samples from distributions. 
@@ -32,6 +94,7 @@ class Samples(object):
     ----------
     samples : ndarray
         Contains the raw samples as a numpy array indexed by the last axis of the array.
+        The samples are stored as a read-only view of the array. To change the samples, assign a new array to the samples attribute.
 
     geometry : cuqi.geometry.Geometry, default None
         Contains the geometry related of the samples
@@ -81,6 +144,32 @@ class Samples(object):
             for i in range(self.Ns):
                 yield self.samples[..., i]
 
+    @property
+    def samples(self):
+        """The raw samples indexed by the last axis."""
+        return self._samples
+
+    @samples.setter
+    def samples(self, value):
+        # Samples are stored as a read-only view such that the cached
+        # statistics cannot become stale by in-place modification. The array
+        # passed in is not modified and stays writable
+        if isinstance(value, np.ndarray):
+            value = value.view()
+            value.setflags(write=False)
+        self._samples = value
+        # Cached statistics are invalidated when the samples are replaced
+        self._stats_cache = {}
+
+    def _cached_stats(self, key, compute):
+        """Return the statistic stored under `key`, computing it with
+        `compute()` on first use. Statistics are cached since the same samples
+        are typically summarized and plotted several times. A copy is returned
+        such that the cached value cannot be modified by the caller."""
+        if key not in self._stats_cache:
+            self._stats_cache[key] = compute()
+        return np.copy(self._stats_cache[key])
+
     @property
     def shape(self):
         return self.samples.shape
@@ -264,6 +353,8 @@ class Samples(object):
         """
         Remove burn-in and thin samples. 
         The burnthinned samples are returned as a new Samples object.
+        The samples of the new object are a view of the original samples,
+        i.e. no sample data is copied and the two objects share memory.
         
         Parameters
         ----------
@@ -285,8 +376,13 @@ class Samples(object):
         """
         if Nb>=self.Ns:
             raise ValueError(f"Number of burn-in {Nb} is greater than or equal number of samples {self.Ns}")
-        new_samples = copy(self)
-        new_samples.samples = self.samples[...,Nb::Nt]
+        new_samples = Samples(self.samples[..., Nb::Nt],
+                              geometry=self._geometry,
+                              is_par=self.is_par,
+                              is_vec=self.is_vec)
+        # Keep any additional attributes, e.g. acc_rate set by the sampler
+        for key, value in vars(self).items():
+            vars(new_samples).setdefault(key, value)
         return new_samples
 
     def plot_mean(self, *args, **kwargs):
@@ -296,9 +392,11 @@ class Samples(object):
         See documentation of `self.geometry` for options.
         """
         self._process_is_par_kwarg(kwargs)
+        return self._plot_mean(self.mean(), *args, **kwargs)
 
-        mean = self.mean()
-        
+    def _plot_mean(self, mean, *args, **kwargs):
+        """Plot an already computed pointwise mean of the samples. The
+        keyword argument is_par is assumed to be processed already."""
         # If mean is function in vector form, convert to function values
         mean = self._convert_to_funvals_if_needed(mean)
 
@@ -363,22 +461,25 @@ class Samples(object):
 
     def mean(self):
         """Compute mean of the samples."""
-        return self._compute_numpy_stats(np.mean, axis=-1)
+        return self._cached_stats(
+            'mean', lambda: self._compute_numpy_stats(np.mean, axis=-1))
 
     def median(self):
         """Compute pointwise median of the samples"""
-        return self._compute_numpy_stats(np.median, axis=-1)
+        return self._cached_stats(
+            'median', lambda: self._compute_numpy_stats(np.median, axis=-1))
 
     def variance(self):
         """Compute pointwise variance of the samples"""
-        return self._compute_numpy_stats(np.var, axis=-1)
+        return self._cached_stats(
+            'variance', lambda: self._compute_numpy_stats(_variance_last_axis, self.mean()))
 
     def compute_ci(self, percent=95):
         """Compute pointwise credibility intervals of the samples."""
         lb = (100-percent)/2
         up = 100-lb
-        return self._compute_numpy_stats(
-            np.percentile, [lb, up], axis=-1) 
+        return self._cached_stats(
+            ('ci', percent), lambda: self._compute_numpy_stats(_percentile_last_axis, [lb, up]))
 
     def ci_width(self, percent = 95):
         """Compute width of the pointwise credibility intervals of the samples"""
@@ -387,7 +488,7 @@ class Samples(object):
     
     def std(self):
         """Compute pointwise standard deviation of the samples"""
-        return self._compute_numpy_stats(np.std, axis=-1)
+        return self._cached_stats('std', lambda: np.sqrt(self.variance()))
 
     def plot_std(self,*args,**kwargs):
         """Plot pointwise standard deviation of the samples
@@ -428,6 +529,11 @@ class Samples(object):
         # Plot samples according to geometry
         return self.geometry.plot(plot_samples, *args, **kwargs)
         
+    def _variable_names(self, variable_indices):
+        """Returns a list of the geometry variable names at variable_indices."""
+        variables = self.geometry.variables
+        return [variables[i] for i in np.atleast_1d(variable_indices).ravel()]
+
     def plot_chain(self, variable_indices=None, *args, **kwargs):
 
         self._raise_error_if_not_vec(self.plot_chain.__name__)
@@ -440,8 +546,7 @@ class Samples(object):
             variable_indices = self._select_random_indices(Nv, dim)
         if 'label' in kwargs.keys():
             raise Exception("Argument 'label' cannot be passed by the user")
-        variables = np.array(self.geometry.variables) #Convert to np array for better slicing
-        variables = variables[variable_indices].flatten()
+        variables = self._variable_names(variable_indices)
         lines = plt.plot(self.samples[variable_indices,:].T,*args,**kwargs)
         plt.legend(variables)
         return lines
@@ -452,8 +557,7 @@ class Samples(object):
 
         if 'label' in kwargs.keys():
             raise Exception("Argument 'label' cannot be passed by the user")
-        variables = np.array(self.geometry.variables) #Convert to np array for better slicing
-        variables = variables[variable_indices].flatten()
+        variables = self._variable_names(variable_indices)
         n, bins, patches = plt.hist(self.samples[variable_indices,:].T,*args,**kwargs)
         plt.legend(variables)
         return patches
@@ -491,6 +595,7 @@ class Samples(object):
         
         # Compute statistics
         lo_conf, up_conf = self.compute_ci(percent)
+        mean = self.mean()
 
         #Extract plotting keywords and put into plot_envelope
         if plot_envelope_kwargs is None:
@@ -503,9 +608,8 @@ class Samples(object):
         self._process_is_par_kwarg(kwargs)
         self._process_is_par_kwarg(pe_kwargs)
 
-        # Create a copy of kwargs without is_par
+        # Create a copy of kwargs for plotting the mean
         kwargs_copy = kwargs.copy()
-        kwargs_copy.pop("is_par")
 
         #User cannot ask for computing statistics on function values then plotting on parameter space
         if not self.is_par:
@@ -529,7 +633,7 @@ class Samples(object):
 
             plt.figure()
             #fig.add_subplot(2,2,1)
-            im_mn = self.plot_mean(*args, **kwargs_copy)
+            im_mn = self._plot_mean(mean, *args, **kwargs_copy)
             plt.title("Sample mean")
             if exact is not None:
                 #fig.add_subplot(2,2,3)
@@ -559,7 +663,7 @@ class Samples(object):
                 **pe_kwargs,
                 label=f"{percent}% Credibility Interval")
 
-            lmn = self.plot_mean(*args, **kwargs_copy, label="Mean")
+            lmn = self._plot_mean(mean, *args, **kwargs_copy, label="Mean")
             plt.title("")
             if exact is not None:
             #TODO: Allow exact to be defined in different space than mean?
@@ -733,12 +837,16 @@ class Samples(object):
 
     def _select_random_indices(self, number, total):
         """ Selects a random number (sorted) of indices defined by input number from a total number. If total>=dim returns all. """
-        total
         if total<=number:
             indices = np.arange(total)
         else:
-            indices = np.random.choice(total, number, replace=False)
-            indices.sort()
+            # Draw unique indices by rejection. np.random.choice without
+            # replacement permutes all total indices, which is wasteful when
+            # selecting a few out of many samples.
+            selected = set()
+            while len(selected) < number:
+                selected.update(np.random.randint(total, size=number-len(selected)).tolist())
+            indices = np.array(sorted(selected))
         return indices
 
     def to_arviz_inferencedata(self, variable_indices=None):
@@ -4,6 +4,7 @@ from ._solver import (
     maximize,
     LS,
     CGLS,
+    PCGLS,
     LM,
     PDHG,
     FISTA,
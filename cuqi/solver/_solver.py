@@ -267,11 +267,16 @@ class CGLS(object):
         # initial state
         x = self.x0.copy()
         if self.explicitA:
-            r = self.b - (self.A @ x)
-            s = (self.A.T @ r) - self.shift*x
-        else:        
-            r = self.b - self.A(x, 1)
-            s = self.A(r, 2) - self.shift*x
+            A, AT = self.A, self.A.T # Transpose formed once instead of in every iteration
+            A_forward = lambda v: A @ v
+            A_adjoint = lambda v: AT @ v
+        else:
+            A_forward = lambda v: self.A(v, 1)
+            A_adjoint = lambda v: self.A(v, 2)
+        r = self.b - A_forward(x)
+        s = A_adjoint(r)
+        if self.shift != 0:
+            s = s - self.shift*x
     
         # initialization
         p = s.copy()
@@ -283,10 +288,7 @@ class CGLS(object):
         k, flag, indefinite = 0, 0, 0
         while (k < self.maxit) and (flag == 0):
             k += 1
-            if self.explicitA:
-                q = self.A @ p
-            else:
-                q = self.A(p, 1)
+            q = A_forward(p)
             delta_cgls = LA.norm(q)**2 + self.shift*LA.norm(p)**2
 
             if (delta_cgls < 0):
@@ -297,15 +299,16 @@ class CGLS(object):
 
             x += alpha_cgls*p
             r -= alpha_cgls*q
-            if self.explicitA:
-                s = self.A.T @ r - self.shift*x     
-            else:
-                s = self.A(r, 2) - self.shift*x
+            s = A_adjoint(r)
+            if self.shift != 0:
+                s = s - self.shift*x
 
-            gamma1 = gamma.copy()
+            gamma1 = gamma
             norms = LA.norm(s)
             gamma = norms**2
-            p = s + (gamma/gamma1)*p
+            # In-place update of the search direction p = s + (gamma/gamma1)*p
+            p *= gamma/gamma1
+            p += s
         
             # convergence
             normx = LA.norm(x)
@@ -1,6 +1,7 @@
 import numpy as np
-from scipy.linalg import toeplitz
-from scipy.sparse import csc_matrix
+from scipy.linalg import toeplitz, solve
+from scipy.sparse import csc_matrix, csr_matrix, diags, vstack
+from scipy.sparse.linalg import spsolve
 from scipy.integrate import quad_vec
 from scipy.signal import fftconvolve
 from scipy.ndimage import convolve1d
@@ -12,6 +13,7 @@ from cuqi.problem import BayesianProblem
 from cuqi.geometry import Geometry, MappedGeometry, StepExpansion, KLExpansion, KLExpansion_Full, CustomKL, Continuous1D, Continuous2D, Image2D
 from cuqi.array import CUQIarray
 import warnings
+from numpy.linalg import LinAlgError
 
 
 
@@ -652,10 +654,10 @@ class Poisson1D(BayesianProblem):
         N = dim-1   # Number of solution nodes
         dx = endpoint/N   # step size
         grid = np.linspace(dx, endpoint, N, endpoint=False)
-        Dx = - np.diag(np.ones(N), 0) + np.diag(np.ones(N-1), 1) #Dx
+        Dx = diags([-np.ones(N), np.ones(N-1)], [0, 1], format='csr') #Dx
         vec = np.zeros(N)
         vec[0] = 1
-        Dx = np.concatenate([vec.reshape([1, -1]), Dx], axis=0)
+        Dx = vstack([csr_matrix(vec), Dx], format='csr')
         Dx /= dx # FD derivative matrix
         rhs = source(grid)
         
@@ -667,8 +669,18 @@ class Poisson1D(BayesianProblem):
         grid_obs = grid_range
         if observation_grid_map is not None:
             grid_obs = observation_grid_map(grid_range)
-        PDE_form = lambda x: (Dx.T @ np.diag(x) @ Dx, rhs)
-        PDE = cuqi.pde.SteadyStateLinearPDE(PDE_form, grid_sol=grid_range,  grid_obs=grid_obs)
+        # The operator Dx.T @ diag(x) @ Dx is tridiagonal. It is assembled and
+        # solved in sparse format on large grids and in dense format otherwise.
+        if N >= 150:
+            DxT = Dx.T.tocsr()
+            PDE_form = lambda x: (DxT @ diags(x) @ Dx, rhs)
+            linalg_solve = spsolve
+        else:
+            Dx = Dx.toarray()
+            DxT = np.ascontiguousarray(Dx.T)
+            PDE_form = lambda x: ((DxT * x) @ Dx, rhs) # Dx.T @ diag(x) @ Dx by scaling columns of Dx.T
+            linalg_solve = _solve_posdef
+        PDE = cuqi.pde.SteadyStateLinearPDE(PDE_form, grid_sol=grid_range,  grid_obs=grid_obs, linalg_solve=linalg_solve)
 
         # Set up geometries for model
         if field_params is None:
@@ -720,6 +732,13 @@ class Poisson1D(BayesianProblem):
         self.exactSolution = x_exact
         self.exactData = y_exact
 
+def _solve_posdef(A, b):
+    """Solves `A*x=b` using a Cholesky factorization, which applies when `A` is symmetric positive definite (e.g. the Poisson operator for a positive conductivity). Falls back to a general solver otherwise."""
+    try:
+        return solve(A, b, assume_a='pos', check_finite=False)
+    except LinAlgError:
+        return solve(A, b)
+
 class Heat1D(BayesianProblem):
     """
     1D Heat test problem. Discretized Heat equation (time-dependent linear PDE).
@@ -803,7 +822,7 @@ class Heat1D(BayesianProblem):
         cfl = 5/11 # the cfl condition to have a stable solution
         dt_approx = cfl*dx**2 # defining approximate time step size
         max_iter = int(max_time/dt_approx) # number of time steps
-        Dxx = (np.diag( -2*np.ones(N) ) + np.diag(np.ones(N-1),-1) + np.diag(np.ones(N-1),1))/dx**2 # FD diffusion operator
+        Dxx = diags([np.ones(N-1), -2*np.ones(N), np.ones(N-1)], [-1, 0, 1], format='csr')/dx**2 # FD diffusion operator (tridiagonal)
         
         # Grids for model
         grid_domain = np.linspace(dx, endpoint, N, endpoint=False)
@@ -133,7 +133,7 @@ def sparse_cholesky(A):
     else:
         raise TypeError('The matrix is not positive semi-definite')
 
-def approx_derivative(func, wrt, direction=None, epsilon=np.sqrt(np.finfo(float).eps)):
+def approx_derivative(func, wrt, direction=None, epsilon=np.sqrt(np.finfo(float).eps), batched=False):
     """Approximates the derivative of callable (possibly vector-valued) function `func` evaluated at point `wrt`. If `direction` is provided, the direction-Jacobian product will be computed and returned, otherwise, the Jacobian matrix (or the gradient in case of a scalar function `func`) will be returned. The approximation is done using forward differences.
 
     Parameters
@@ -151,6 +151,11 @@ def approx_derivative(func, wrt, direction=None, epsilon=np.sqrt(np.finfo(float)
     epsilon: float
         The spacing in the finite difference approximation.
 
+    batched: bool
+        If True, `func` is assumed to accept a 2D array holding one point
+        per column and to return its values column-wise (e.g. a matrix product).
+        All perturbed points are then evaluated in a single call to `func`.
+
     Returns
     -------
     ndarray
@@ -172,16 +177,23 @@ def approx_derivative(func, wrt, direction=None, epsilon=np.sqrt(np.finfo(float)
     # We compute the Jacobian matrix of func using forward differences.
     # If the function is scalar-valued, we compute the gradient instead.
     # If the direction is provided, we compute the direction-Jacobian product.
-    wrt = np.asfarray(wrt)
+    wrt = np.asarray(wrt)
+    if not np.issubdtype(wrt.dtype, np.inexact):
+        wrt = wrt.astype(float)
     f0 = func(wrt)
-    Matr = np.zeros([infer_len(wrt), infer_len(f0)])
-    dx = np.zeros(len(wrt))
 
     # Compute the Jacobian matrix (transpose)
-    for i in range(len(wrt)):
-        dx[i] = epsilon
-        Matr[i] = (func(wrt+dx) - f0)/epsilon
-        dx[i] = 0.0
+    if batched:
+        # Evaluate func at all perturbed points (columns) in one call
+        F = func(wrt[:, None] + epsilon*np.eye(len(wrt)))
+        Matr = ((F.T - f0)/epsilon).reshape([infer_len(wrt), infer_len(f0)])
+    else:
+        Matr = np.empty([infer_len(wrt), infer_len(f0)]) # Every row is filled below
+        dx = np.zeros(len(wrt))
+        for i in range(len(wrt)):
+            dx[i] = epsilon
+            Matr[i] = (func(wrt+dx) - f0)/epsilon
+            dx[i] = 0.0
 
     # Return the Jacobian matrix (or the gradient)
     # or the direction-Jacobian product
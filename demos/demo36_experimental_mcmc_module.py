@@ -84,15 +84,15 @@ sampler.set_state(state)
 # Checkpointing
 #
 # The new sampler supports checkpointing by saving and loading state (not samples).
-# Checkpoint uses the set_state and get_state methods to save and load state and then pickles the state. 
+# Checkpoint uses the set_state and get_state methods to save and load state, which is stored in numpy's .npz format (no pickling).
 # For example:
 
 # Save current state of sampler (e.g. current point, current scale etc.)
-sampler.save_checkpoint('demo36_sampler_checkpoint.pickle')
+sampler.save_checkpoint('demo36_sampler_checkpoint.npz')
 
 # Then using a new sampler can load checkpoint
 sampler2 = MHNew(target)
-sampler2.load_checkpoint('demo36_sampler_checkpoint.pickle')
+sampler2.load_checkpoint('demo36_sampler_checkpoint.npz')
 
 print(sampler.scale) # Should be the same
 print(sampler2.scale) # Should be the same
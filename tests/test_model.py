@@ -471,3 +471,62 @@ def test_model_allows_jacobian_or_gradient():
 
     assert np.allclose(model_grad.gradient(dir, wrt), model_jac.gradient(dir, wrt))
 
+
+@pytest.mark.parametrize("matrix", [np.random.randn(6, 4),
+                                    sp.sparse.random(6, 4, density=0.5, format='csc'),
+                                    sp.sparse.random(6, 4, density=0.5, format='csr'),
+                                    sp.sparse.random(6, 4, density=0.5, format='lil')])
+def test_LinearModel_forward_and_adjoint_of_samples(matrix):
+    """ Test that applying a matrix-based LinearModel to Samples matches applying it to each sample. """
+    model = cuqi.model.LinearModel(matrix)
+
+    x = cuqi.samples.Samples(np.random.randn(4, 5))
+    y = cuqi.samples.Samples(np.random.randn(6, 5))
+
+    fwd = model.forward(x)
+    adj = model.adjoint(y)
+
+    assert isinstance(fwd, cuqi.samples.Samples)
+    assert isinstance(adj, cuqi.samples.Samples)
+    for i in range(x.Ns):
+        assert np.allclose(fwd.samples[:, i], model.forward(x.samples[:, i]))
+        assert np.allclose(adj.samples[:, i], model.adjoint(y.samples[:, i]))
+
+def test_LinearModel_getMatrix_in_blocks():
+    """ Test that get_matrix probes callable models correctly when the domain spans several probing blocks. """
+    A = sp.sparse.random(20, 1100, density=0.01, format='csr', random_state=0)
+    model = cuqi.model.LinearModel(lambda x: A@x, lambda y: A.T@y, range_geometry=20, domain_geometry=1100)
+
+    mat = model.get_matrix()
+
+    assert sp.sparse.isspmatrix_csc(mat)
+    assert mat.shape == A.shape
+    assert np.allclose(mat.toarray(), A.toarray())
+
+def test_LinearModel_get_sparse_matrix():
+    """ Test that get_sparse_matrix returns a cached CSC version of the model matrix. """
+    A = np.random.randn(5, 3)
+    model = cuqi.model.LinearModel(A)
+
+    mat = model.get_sparse_matrix()
+
+    assert model.get_matrix() is A
+    assert sp.sparse.isspmatrix_csc(mat)
+    assert np.allclose(mat.toarray(), A)
+    assert model.get_sparse_matrix() is mat
+
+def test_model_forward_of_samples_with_threads():
+    """ Test that evaluating the forward of Samples in several threads gives the same result as in a single thread. """
+    A = np.random.randn(6, 4)
+    model = cuqi.model.Model(lambda x: np.sin(A@x), range_geometry=6, domain_geometry=4)
+    x = cuqi.samples.Samples(np.random.randn(4, 10))
+
+    assert np.allclose(model.forward(x, n_jobs=2).samples, model.forward(x).samples)
+
+def test_LinearModel_converts_slow_sparse_formats():
+    """ Test that sparse matrices in formats without compiled products are stored in CSR format. """
+    A = sp.sparse.random(6, 4, density=0.5, format='lil')
+    model = cuqi.model.LinearModel(A)
+
+    assert sp.sparse.isspmatrix_csr(model.get_matrix())
+    assert np.allclose(model.get_matrix().toarray(), A.toarray())
@@ -361,3 +361,27 @@ def test_TimeDependentLinearPDE_wave1D(copy_reference):
     solution_file = copy_reference("data/Wave1D_solution.npz")
     expected_sol = np.load(solution_file)
     assert(np.allclose(sol, expected_sol['sol'], rtol=1e-3, atol=1e-6))
+
+@pytest.mark.parametrize("method, linalg_solve",
+                         [('forward_euler', None),
+                          ('backward_euler', scipy.sparse.linalg.spsolve)])
+def test_TimeDependentLinearPDE_sparse_diff_op(method, linalg_solve):
+    """ Test that time stepping with a sparse differential operator gives the same solution as with the dense operator. """
+    dim = 50
+    dx = 1/(dim+1)
+    time_steps = np.linspace(0, 0.01, 101)
+    Dxx_sparse = scipy.sparse.diags([np.ones(dim-1), -2*np.ones(dim), np.ones(dim-1)],
+                                    [-1, 0, 1], format='csr')/dx**2
+    Dxx_dense = Dxx_sparse.toarray()
+    initial_condition = np.sin(np.pi*np.linspace(dx, 1-dx, dim))
+
+    sols = []
+    for Dxx, solve in [(Dxx_dense, None), (Dxx_sparse, linalg_solve)]:
+        PDE = cuqi.pde.TimeDependentLinearPDE(
+            lambda IC, t, Dxx=Dxx: (Dxx, np.zeros(dim), IC), time_steps,
+            method=method, linalg_solve=solve)
+        PDE.assemble(initial_condition)
+        sol, _ = PDE.solve()
+        sols.append(sol)
+
+    assert np.allclose(sols[0], sols[1])
@@ -416,3 +416,190 @@ def test_computing_statistics_on_arbitrary_objects_raises_error(method):
     samples = cuqi.samples.Samples([object(), object()])
     with pytest.raises(TypeError, match=r"Cannot compute statistics"):
         method(samples)
+
+@pytest.mark.parametrize("Ns", [1, 2, 7, 100])
+@pytest.mark.parametrize("percent", [0, 50, 95, 100])
+def test_compute_ci_matches_numpy_percentile(Ns, percent):
+    """Test that the partition based credibility interval matches np.percentile."""
+    np.random.seed(0)
+    samples = Samples(np.random.randn(3, Ns))
+    lb = (100-percent)/2
+    expected = np.percentile(samples.samples, [lb, 100-lb], axis=-1)
+    assert np.allclose(samples.compute_ci(percent), expected)
+
+def test_CUQIarray_caches_geometry_transforms():
+    """Test that funvals and parameters are only recomputed when the data or geometry changes."""
+    calls = {"par2fun": 0, "fun2par": 0}
+    def par2fun(p):
+        calls["par2fun"] += 1
+        return p**2
+    def fun2par(f):
+        calls["fun2par"] += 1
+        return np.sqrt(f)
+    geom = cuqi.geometry.MappedGeometry(cuqi.geometry.Continuous1D(3), map=par2fun, imap=fun2par)
+    geom.cache_transforms = True
+
+    x = cuqi.array.CUQIarray(np.array([1., 2., 3.]), geometry=geom)
+    assert np.allclose(x.funvals, [1, 4, 9])
+    f = x.funvals
+    assert calls["par2fun"] == 1
+
+    # Modifying the returned function values does not affect the cache
+    f[0] = 100
+    assert np.allclose(x.funvals, [1, 4, 9])
+    assert calls["par2fun"] == 1
+
+    # Modifying the data invalidates the cache
+    x[0] = 2
+    assert np.allclose(x.funvals, [4, 4, 9])
+    assert calls["par2fun"] == 2
+
+    # Changing the geometry invalidates the cache
+    x.geometry = cuqi.geometry.MappedGeometry(cuqi.geometry.Continuous1D(3), map=par2fun, imap=fun2par)
+    x.funvals
+    assert calls["par2fun"] == 3
+
+    y = cuqi.array.CUQIarray(np.array([1., 4., 9.]), is_par=False, geometry=geom)
+    y.parameters
+    assert np.allclose(y.parameters, [1, 2, 3])
+    assert calls["fun2par"] == 1
+
+    # Geometries that do not opt in are not cached
+    x = cuqi.array.CUQIarray(np.array([1., 2., 3.]), geometry=cuqi.geometry.MappedGeometry(cuqi.geometry.Continuous1D(3), map=par2fun, imap=fun2par))
+    x.funvals
+    x.funvals
+    assert calls["par2fun"] == 5
+    assert x._transform_cache is None
+
+def test_burnthin_returns_view_and_keeps_attributes():
+    """Test that burnthin shares memory with the original samples and keeps the attributes."""
+    geom = cuqi.geometry.Continuous1D(3)
+    samples = Samples(np.random.randn(3, 20), geometry=geom)
+    samples.acc_rate = 0.5
+    new_samples = samples.burnthin(5, 3)
+
+    assert np.shares_memory(new_samples.samples, samples.samples)
+    assert np.allclose(new_samples.samples, samples.samples[:, 5::3])
+    assert new_samples.geometry is geom
+    assert new_samples.acc_rate == 0.5
+
+@pytest.mark.parametrize("Ns", [40, 1003])
+def test_spectrum0_matches_spectrum(Ns):
+    """Test that the spectral density at frequency zero used by the Geweke diagnostic matches the FFT based estimate."""
+    from cuqi.diagnostics import spectrum0, spectrum
+    np.random.seed(0)
+    x = np.random.randn(Ns, 4)
+    expected = [spectrum(x[:, i].copy(), Ns)[0][0] for i in range(x.shape[1])]
+    assert np.allclose(spectrum0(x), expected)
+
+@pytest.mark.parametrize("geometry", [cuqi.geometry.Continuous1D(3),
+                                      cuqi.geometry.Discrete(3),
+                                      cuqi.geometry._DefaultGeometry1D(3)])
+def test_CUQIarray_identity_geometry_funvals_and_parameters_are_views(geometry):
+    """Test that funvals and parameters of CUQIarrays with identity geometries share memory with the array."""
+    x = cuqi.array.CUQIarray(np.array([1., 2., 3.]), geometry=geometry)
+    f = x.funvals
+    p = f.parameters
+    assert f.is_par is False and p.is_par is True
+    assert f.geometry is geometry and p.geometry is geometry
+    assert np.shares_memory(f, x) and np.shares_memory(p, x)
+    assert np.allclose(p, [1, 2, 3])
+
+def test_statistics_are_cached_and_invalidated():
+    """Test that statistics are cached and recomputed when the samples are replaced."""
+    np.random.seed(0)
+    samples = Samples(np.random.randn(3, 50))
+    mean = samples.mean()
+
+    # Modifying the returned statistic does not affect the cache
+    mean[0] = 100
+    assert np.allclose(samples.mean(), np.mean(samples.samples, axis=-1))
+    assert np.allclose(samples.compute_ci(90), np.percentile(samples.samples, [5, 95], axis=-1))
+
+    # Replacing the samples invalidates the cache
+    samples.samples = np.random.randn(3, 20)
+    assert np.allclose(samples.mean(), np.mean(samples.samples, axis=-1))
+    assert np.allclose(samples.std(), np.std(samples.samples, axis=-1))
+    assert np.allclose(samples.compute_ci(90), np.percentile(samples.samples, [5, 95], axis=-1))
+
+    # Samples cannot be modified in-place, which would leave the cache stale
+    with pytest.raises(ValueError):
+        samples.samples[0, 0] = 100
+    with pytest.raises(ValueError):
+        samples.samples *= 2
+
+    # Burnthinned samples compute their own statistics
+    new_samples = samples.burnthin(10)
+    assert np.allclose(new_samples.mean(), np.mean(samples.samples[:, 10:], axis=-1))
+
+def test_select_random_indices_are_unique_and_sorted():
+    """Test that randomly selected indices are unique, sorted and within range."""
+    np.random.seed(0)
+    samples = Samples(np.random.randn(2, 10))
+    for total in [6, 10, 1000000]:
+        indices = samples._select_random_indices(5, total)
+        assert len(indices) == 5
+        assert np.all(np.diff(indices) > 0)
+        assert indices[0] >= 0 and indices[-1] < total
+    assert np.array_equal(samples._select_random_indices(5, 3), np.arange(3))
+
+def test_compute_ci_for_several_percents():
+    """Test that credibility intervals computed for several percents match np.percentile and that no copy of the samples is cached."""
+    np.random.seed(0)
+    samples = Samples(np.random.randn(3, 101))
+    for percent in [95, 50, 90, 99, 100]:
+        lb = (100-percent)/2
+        expected = np.percentile(samples.samples, [lb, 100-lb], axis=-1)
+        assert np.allclose(samples.compute_ci(percent), expected)
+        assert np.allclose(samples.ci_width(percent), expected[1]-expected[0])
+    assert all(np.shape(value) == (2, 3) for value in samples._stats_cache.values())
+
+def test_CUQIarray_raw_funvals_and_parameters_are_numpy_arrays():
+    """Test that the internal raw funvals and parameters match the wrapped versions."""
+    geom = cuqi.geometry.MappedGeometry(cuqi.geometry.Continuous1D(3), map=lambda x: x**2, imap=np.sqrt)
+    x = cuqi.array.CUQIarray(np.array([1., 2., 3.]), geometry=geom)
+    assert type(x._funvals_raw) is np.ndarray
+    assert np.allclose(x._funvals_raw, x.funvals)
+    f = x.funvals
+    assert type(f._parameters_raw) is np.ndarray
+    assert np.allclose(f._parameters_raw, f.parameters)
+
+@pytest.mark.parametrize("offset", [0, 1e6, 1e9])
+def test_moments_match_numpy(offset):
+    """Test that the mean, variance and std match numpy, also for samples with small variance relative to the mean."""
+    np.random.seed(0)
+    samples = Samples(offset + np.random.randn(4, 200))
+    assert np.allclose(samples.std(), np.std(samples.samples, axis=-1))
+    assert np.allclose(samples.variance(), np.var(samples.samples, axis=-1))
+    assert np.array_equal(samples.mean(), np.mean(samples.samples, axis=-1))
+
+@pytest.mark.parametrize("block_bytes", [8, 1000, 2**20])
+def test_blocked_variance_matches_numpy(block_bytes):
+    """Test that the blocked two pass variance matches numpy for different block sizes."""
+    from cuqi.samples._samples import _variance_last_axis
+    np.random.seed(0)
+    samples = 5 + np.random.randn(3, 4, 1001)
+    variance = _variance_last_axis(samples, np.mean(samples, axis=-1), block_bytes=block_bytes)
+    assert np.allclose(variance, np.var(samples, axis=-1))
+
+def test_mean_does_not_depend_on_call_history():
+    """Test that the mean is the same whether or not credibility intervals were computed or plotted first."""
+    np.random.seed(0)
+    samples = Samples(1e6 + np.random.randn(4, 201))
+    samples.plot_ci(95)
+    plt.close('all')
+    assert np.array_equal(samples.mean(), np.mean(samples.samples, axis=-1))
+
+def test_samples_are_read_only_view_of_input():
+    """Test that Samples stores a read-only view of the array and leaves the input array writable."""
+    array = np.random.randn(3, 10)
+    samples = Samples(array)
+    assert np.shares_memory(samples.samples, array)
+    assert not samples.samples.flags.writeable
+    assert array.flags.writeable
+
+def test_compute_ci_of_fortran_ordered_samples():
+    """Test that credibility intervals of F-contiguous samples (as returned by the samplers) match np.percentile."""
+    np.random.seed(0)
+    samples = Samples(np.random.randn(101, 3).T)
+    assert np.allclose(samples.compute_ci(90), np.percentile(samples.samples, [5, 95], axis=-1))
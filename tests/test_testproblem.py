@@ -122,6 +122,21 @@ def test_Poisson():
     assert np.linalg.norm(model.forward(true_kappa, is_par=False)) == approx(6.183419642601269)
     assert np.linalg.norm(model.forward(np.ones(model.domain_dim))) == approx(5.195849938761418)
 
+@pytest.mark.parametrize("dim", [64, 256])
+def test_Poisson1D_forward_matches_dense_solve(dim):
+    """ Test that the Poisson1D forward (dense or sparse depending on dim) matches a dense solve of Dx.T @ diag(x) @ Dx u = f. """
+    source = lambda xs: 10*np.exp( -( (xs - 0.5)**2 ) / 0.02)
+    model = cuqi.testproblem.Poisson1D(dim=dim, source=source).model
+
+    N = dim-1
+    dx = 1/N
+    Dx = - np.diag(np.ones(N), 0) + np.diag(np.ones(N-1), 1)
+    Dx = np.concatenate([np.eye(1, N), Dx], axis=0)/dx
+    x = 1 + np.linspace(0, 1, dim)
+    u = np.linalg.solve(Dx.T @ np.diag(x) @ Dx, source(np.linspace(dx, 1, N, endpoint=False)))
+
+    assert np.allclose(model.forward(x), u)
+
 def test_Heat():
     # %% HEAT
     N = 128
@@ -134,6 +149,18 @@ def test_Heat():
     assert np.linalg.norm(model.forward(true_kappa, is_par=False)) == approx(0.5476375563249378)
     assert np.linalg.norm(model.forward(np.ones(model.domain_dim))) == approx(0.548657107830281)
 
+def test_Heat1D_observes_final_solution_once_on_observation_grid():
+    """ Test that the Heat1D observation picks the final time solution on the observation grid exactly once (no repeated subsampling). """
+    TP = cuqi.testproblem.Heat1D(dim=40, max_time=0.01, observation_grid_map=lambda x: x[::2])
+    model = TP.model
+    x = np.ones(model.domain_dim)
+
+    model.pde.assemble(x)
+    sol, _ = model.pde.solve()
+
+    assert model.range_dim == 20
+    assert np.allclose(model.forward(x), sol[::2, -1])
+
 def test_Abel():
     N = 128
     L = 1
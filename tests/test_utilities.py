@@ -1,7 +1,7 @@
 import pytest
 from scipy.linalg import cholesky
 from scipy.sparse import diags
-from cuqi.utilities import sparse_cholesky
+from cuqi.utilities import sparse_cholesky, approx_derivative
 import numpy as np
 
 
@@ -18,3 +18,17 @@ def test_sparse_cholesky(P):
     L2 = sparse_cholesky(P) 
 
     assert np.allclose(L1, L2.toarray()) # Convert to dense to compare
+
+@pytest.mark.parametrize("func", [
+    lambda x: np.array([[1, 2, 3], [0, -1, 4]])@x**2,
+    lambda x: np.sum(x**3, axis=0)
+])
+def test_approx_derivative_batched(func):
+    """ Test that evaluating all perturbed points in one call gives the same derivative as the point-by-point evaluation. """
+    wrt = np.array([1.0, -2.0, 0.5])
+    direction = np.ones(np.size(func(wrt)))
+
+    assert np.allclose(approx_derivative(func, wrt, batched=True),
+                       approx_derivative(func, wrt))
+    assert np.allclose(approx_derivative(func, wrt, direction, batched=True),
+                       approx_derivative(func, wrt, direction))
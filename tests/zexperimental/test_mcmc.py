@@ -275,6 +275,50 @@ checkpoint_targets = [
     cuqi.experimental.mcmc.LinearRTONew(cuqi.testproblem.Deconvolution1D().posterior),
 ]
     
+def test_checkpoint_restores_state_types(tmp_path):
+    """ Check that state values that are not arrays are restored with their original type and without pickling. """
+    sampler = cuqi.experimental.mcmc.MALANew(cuqi.testproblem.Deconvolution1D(dim=16).posterior, scale=0.01)
+    sampler.warmup(5)
+    state = sampler.get_state()
+    state['state']['scale'] = 0.5
+    extra = {'a_list': [1, 2, 3], 'a_tuple': (1.0, 2.0), 'nothing': None, 'an_int': 3, 'a_str': 'abc'}
+
+    original_get_state = sampler.get_state
+    sampler.get_state = lambda: {**state, 'extra': extra}
+    path = tmp_path / "checkpoint.npz"
+    sampler.save_checkpoint(path)
+    sampler.get_state = original_get_state
+
+    loaded = {}
+    sampler_fresh = cuqi.experimental.mcmc.MALANew(sampler.target, scale=0.01)
+    sampler_fresh.set_state = lambda state: loaded.update(state)
+    sampler_fresh.load_checkpoint(path)
+
+    for key, value in extra.items():
+        assert type(loaded['extra'][key]) is type(value)
+        assert loaded['extra'][key] == value
+    assert loaded['metadata']['sampler_type'] == 'MALANew'
+    assert np.array_equal(loaded['state']['current_point'], state['state']['current_point'])
+
+    # Files are loaded without pickling
+    with np.load(path, allow_pickle=False) as data:
+        assert all(data[name].dtype != object for name in data.files)
+
+def test_load_pickle_checkpoint_is_deprecated(tmp_path):
+    """ Check that checkpoints saved with pickle by earlier versions can still be loaded, with a deprecation warning. """
+    import pickle
+    sampler = cuqi.experimental.mcmc.MALANew(cuqi.testproblem.Deconvolution1D(dim=16).posterior, scale=0.01)
+    sampler.warmup(5)
+    path = tmp_path / "checkpoint.pickle"
+    with open(path, 'wb') as handle:
+        pickle.dump(sampler.get_state(), handle)
+
+    sampler_fresh = cuqi.experimental.mcmc.MALANew(sampler.target, scale=0.01)
+    with pytest.warns(DeprecationWarning, match="pickle"):
+        sampler_fresh.load_checkpoint(path)
+    assert np.array_equal(sampler_fresh.current_point, sampler.current_point)
+    assert sampler_fresh.scale == sampler.scale
+
 # List of samplers from cuqi.experimental.mcmc that should be skipped for checkpoint testing
 skip_checkpoint = [
     cuqi.experimental.mcmc.SamplerNew,
@@ -309,7 +353,7 @@ def test_ensure_all_not_skipped_samplers_are_tested_for_checkpointing():
 
 
 @pytest.mark.parametrize("sampler", checkpoint_targets)
-def test_checkpointing(sampler: cuqi.experimental.mcmc.SamplerNew):
+def test_checkpointing(sampler: cuqi.experimental.mcmc.SamplerNew, tmp_path):
     """ Check that the checkpointing functionality works. Tested with save_checkpoint(filename) and load_checkpoint(filename).
     This also implicitly tests the get_state(), set_state(), get_history(), and set_history() as well as the reset() methods.
     
@@ -319,7 +363,8 @@ def test_checkpointing(sampler: cuqi.experimental.mcmc.SamplerNew):
     sampler.warmup(50).sample(50)
 
     # Save checkpoint
-    sampler.save_checkpoint('checkpoint.pickle')
+    checkpoint_path = tmp_path / "checkpoint.npz"
+    sampler.save_checkpoint(checkpoint_path)
 
     # Reset (soft) the sampler, e.g. remove all samples but keep the state
     sampler.reset()
@@ -330,7 +375,7 @@ def test_checkpointing(sampler: cuqi.experimental.mcmc.SamplerNew):
 
     # Now load the checkpoint on completely fresh sampler not even with target
     sampler_fresh = sampler.__class__(sampler.target) # In principle init with no arguments. Now still with target
-    sampler_fresh.load_checkpoint('checkpoint.pickle')
+    sampler_fresh.load_checkpoint(checkpoint_path)
 
     # Do some more samples from pre-defined rng state
     np.random.seed(0)
@@ -441,3 +486,154 @@ def test_state_is_fully_updated_after_warmup_step(sampler: cuqi.experimental.mcm
         error_details = '\n'.join([f"State '{key}' not updated correctly after warmup. {message}" for key, message in failed_updates.items()])
         error_message = f"Errors occurred in {sampler.__class__.__name__} - issues with keys: {failed_keys}.\n{error_details}"
         assert not failed_updates, error_message
+
+def test_sample_buffer_grows_and_keeps_returned_samples():
+    """ Test that repeated sampling grows the sample buffer and that previously returned samples are not overwritten. """
+    sampler = cuqi.experimental.mcmc.MHNew(cuqi.testproblem.Deconvolution1D(dim=10).posterior, scale=0.5)
+
+    np.random.seed(0)
+    samples1 = sampler.warmup(20).sample(30).get_samples().samples
+    samples1_copy = samples1.copy()
+
+    samples2 = sampler.sample(100).get_samples().samples
+    assert samples2.shape == (10, 151)
+    assert len(sampler._acc) == 151
+    assert np.allclose(samples2[:, :51], samples1_copy)
+
+    sampler.reset()
+    sampler.sample(60)
+    assert sampler.get_samples().samples.shape == (10, 60)
+    assert np.allclose(samples1, samples1_copy)
+
+def test_LinearRTO_PCGLS_inner_solver_matches_CGLS():
+    """ Test that LinearRTONew with the Jacobi preconditioned inner solver gives the same samples as CGLS when the inner solver converges. """
+    posterior = cuqi.testproblem.Deconvolution1D(dim=16).posterior
+
+    samples = []
+    for inner_solver in ["CGLS", "PCGLS"]:
+        sampler = cuqi.experimental.mcmc.LinearRTONew(posterior, maxit=200, tol=1e-12, inner_solver=inner_solver)
+        np.random.seed(0)
+        samples.append(sampler.sample(10).get_samples().samples)
+
+    assert np.allclose(samples[0], samples[1], rtol=1e-5, atol=1e-6)
+
+def test_LinearRTO_PCGLS_requires_model_matrices():
+    """ Test that the PCGLS inner solver is rejected for forward models given by functions, since the preconditioner needs their matrices. """
+    A, data, _ = cuqi.testproblem.Deconvolution1D(dim=16).get_components()
+    matrix = A.get_matrix()
+    model = cuqi.model.LinearModel(lambda x: matrix@x, lambda y: matrix.T@y, range_geometry=A.range_geometry, domain_geometry=A.domain_geometry)
+    x = cuqi.distribution.Gaussian(np.zeros(16), 1)
+    y = cuqi.distribution.Gaussian(model@x, 0.01)
+    posterior = cuqi.distribution.JointDistribution(x, y)(y=data)
+
+    with pytest.raises(ValueError, match="PCGLS"):
+        cuqi.experimental.mcmc.LinearRTONew(posterior, inner_solver="PCGLS")
+
+    sampler = cuqi.experimental.mcmc.LinearRTONew(posterior)
+    with pytest.raises(ValueError, match="PCGLS"):
+        sampler.inner_solver = "PCGLS"
+
+def test_get_samples_does_not_copy():
+    """ Test that get_samples returns a view of the internal sample buffer in (dim, Ns) layout. """
+    sampler = cuqi.experimental.mcmc.MHNew(cuqi.testproblem.Deconvolution1D(dim=10).posterior, scale=0.5)
+    samples = sampler.sample(20).get_samples().samples
+
+    assert samples.shape == (10, 21)
+    assert np.shares_memory(samples, sampler._samples)
+    assert samples.flags.f_contiguous
+
+def test_sample_batches_are_saved_to_disk(tmp_path):
+    """ Test that samples are saved to disk in batches of the requested size. """
+    sampler = cuqi.experimental.mcmc.MHNew(cuqi.testproblem.Deconvolution1D(dim=10).posterior, scale=0.5)
+    sampler.sample(25, batch_size=10, sample_path=str(tmp_path))
+
+    samples = sampler.get_samples().samples
+    for batch_id in range(2):
+        batch = np.load(tmp_path / f"batch_{batch_id:04d}.npz")
+        assert batch["batch_id"] == batch_id
+        assert np.allclose(batch["samples"], samples[:, 1+10*batch_id:11+10*batch_id].T)
+    assert not (tmp_path / "batch_0002.npz").exists()
+
+def test_checkpoint_is_saved_as_npz(tmp_path):
+    """ Test that checkpoints store the sampler state as numpy arrays and restore scalars as scalars. """
+    sampler = cuqi.experimental.mcmc.MHNew(cuqi.testproblem.Deconvolution1D(dim=10).posterior, scale=0.5)
+    sampler.warmup(20)
+
+    path = str(tmp_path / "checkpoint.npz")
+    sampler.save_checkpoint(path)
+
+    with np.load(path) as data:
+        assert data["metadata/sampler_type"] == "MHNew"
+        assert np.allclose(data["state/current_point"], sampler.current_point)
+
+    sampler_fresh = cuqi.experimental.mcmc.MHNew(sampler.target)
+    sampler_fresh.load_checkpoint(path)
+    assert np.isscalar(sampler_fresh.scale)
+    assert sampler_fresh.scale == sampler.scale
+    assert np.allclose(sampler_fresh.current_point, sampler.current_point)
+
+@pytest.mark.parametrize("target", [create_regularized_target(dim=32), create_multiple_likelihood_posterior_regularized_target(dim=32)])
+def test_RegularizedLinearRTO_automatic_stepsize(target):
+    """ Test that the automatic stepsize of RegularizedLinearRTONew is 0.99 over the squared spectral norm of the stacked RTO operator. """
+    sampler = cuqi.experimental.mcmc.RegularizedLinearRTONew(target)
+
+    # Form the stacked operator explicitly by applying it to the identity
+    M = np.column_stack([sampler.M(e, 1) for e in np.eye(sampler.n)])
+    expected_stepsize = 0.99/np.linalg.norm(M, 2)**2
+
+    assert sampler._stepsize == pytest.approx(expected_stepsize, rel=1e-3)
+
+@pytest.mark.parametrize("target", [cuqi.testproblem.Deconvolution1D(dim=16).posterior, create_multiple_likelihood_posterior_target(dim=16)])
+def test_LinearRTO_callable_operator_returns_fresh_arrays(target):
+    """ Test that results of the callable RTO operator are not overwritten by later calls. """
+    sampler = cuqi.experimental.mcmc.LinearRTONew(target)
+    x1, x2 = np.ones(sampler.n), np.arange(sampler.n, dtype=float)
+
+    Mx1 = sampler.M(x1, 1)
+    Mx1_copy = Mx1.copy()
+    sampler.M(x2, 1)
+
+    assert np.allclose(Mx1, Mx1_copy)
+
+def test_LinearRTO_single_precision():
+    """ Test that LinearRTONew in single precision gives samples close to the double precision samples. """
+    posterior = cuqi.testproblem.Deconvolution1D(dim=32).posterior
+
+    samples = {}
+    for dtype in [np.float64, np.float32]:
+        sampler = cuqi.experimental.mcmc.LinearRTONew(posterior, maxit=20, dtype=dtype)
+        assert sampler.b_tild.dtype == dtype
+        np.random.seed(0)
+        samples[dtype] = sampler.sample(10).get_samples().samples
+
+    assert samples[np.float32].dtype == np.float64
+    assert np.allclose(samples[np.float32], samples[np.float64], rtol=1e-2, atol=1e-2)
+
+def test_callback_receives_sample_and_index():
+    """ Test that the callback is called with each stored sample and its index in the samples. """
+    callback_samples = {}
+    def callback(sample, sample_index):
+        callback_samples[sample_index] = sample
+
+    sampler = cuqi.experimental.mcmc.MHNew(cuqi.testproblem.Deconvolution1D(dim=10).posterior, scale=0.5, callback=callback)
+    samples = sampler.warmup(10).sample(15).get_samples().samples
+
+    assert sorted(callback_samples) == list(range(1, 26))
+    for sample_index, sample in callback_samples.items():
+        assert np.allclose(sample, samples[:, sample_index])
+
+@pytest.mark.parametrize("target", [cuqi.testproblem.Deconvolution1D(dim=16).posterior, create_multiple_likelihood_posterior_target(dim=16)])
+def test_LinearRTO_block_size_matches_sequential_sampling(target):
+    """ Test that LinearRTONew drawing samples in blocks gives the same samples as drawing them one at a time when the inner solver converges. """
+    samples = []
+    for block_size in [1, 4]:
+        sampler = cuqi.experimental.mcmc.LinearRTONew(target, maxit=200, tol=1e-12, block_size=block_size)
+        np.random.seed(0)
+        samples.append(sampler.sample(10).get_samples().samples)
+
+    assert np.allclose(samples[0], samples[1], rtol=1e-5, atol=1e-6)
+
+def test_RegularizedLinearRTO_does_not_support_blocks():
+    """ Test that RegularizedLinearRTONew raises an error if samples are requested in blocks. """
+    with pytest.raises(ValueError, match="block"):
+        cuqi.experimental.mcmc.RegularizedLinearRTONew(create_regularized_target(dim=16), stepsize=1e-3, block_size=2)